@@ -0,0 +1,87 @@
+"""
+Compares request/reply latency and publish throughput under the asyncio and uvloop event loops.
+Requires a NATS broker and uvloop (pip install panini[uvloop]):
+
+    python -m benchmarks.event_loop --requests 5000 --messages 100000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from panini.managers.event_manager import Listen
+from panini.managers.nats_client import NATSClient
+from panini.utils.helper import set_event_loop_policy
+
+
+async def create_client(name: str, host: str, port: int) -> NATSClient:
+    nats_client = NATSClient(
+        host=host,
+        port=port,
+        servers=None,
+        client_nats_name=name,
+        loop=asyncio.get_running_loop(),
+        allow_reconnect=False,
+    )
+    await nats_client.connect()
+    return nats_client
+
+
+async def measure(event_loop: str, requests: int, messages: int, host: str, port: int) -> dict:
+    responder = await create_client(f"event_loop_benchmark_responder_{event_loop}", host, port)
+    requester = await create_client(f"event_loop_benchmark_requester_{event_loop}", host, port)
+
+    async def echo(msg):
+        return msg.data
+
+    await responder.subscribe_new_subject(
+        Listen(callback=echo, subject="benchmark.event_loop.echo", _meta={})
+    )
+    await responder.client.flush()
+    message = {"key1": "value1", "key2": 2, "key3": [1, 2, 3]}
+
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await requester.request("benchmark.event_loop.echo", message)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        await requester.publish("benchmark.event_loop.publish", message)
+    await requester.client.flush()
+    publish_rate = messages / (time.perf_counter() - start)
+
+    await requester.client.close()
+    await responder.client.close()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "publish": publish_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4222)
+    args = parser.parse_args()
+
+    results = {}
+    for event_loop in ("asyncio", "uvloop"):
+        if set_event_loop_policy(event_loop) != event_loop:
+            continue
+        results[event_loop] = asyncio.run(
+            measure(event_loop, args.requests, args.messages, args.host, args.port)
+        )
+
+    print(f"{'loop':>8} {'p50, us':>10} {'p99, us':>10} {'publish, msgs/sec':>18}")
+    for event_loop, result in results.items():
+        print(f"{event_loop:>8} {result['p50']:>10.0f} {result['p99']:>10.0f} {result['publish']:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
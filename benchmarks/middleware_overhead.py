@@ -0,0 +1,80 @@
+"""
+Measures per-message overhead of compiled middleware chains for 0, 1, 3 and 10 middlewares.
+Does not require a NATS broker:
+
+    python -m benchmarks.middleware_overhead --messages 200000
+"""
+import argparse
+import asyncio
+import time
+
+from nats.aio.msg import Msg
+
+from panini.managers.middleware_manager import MiddlewareManager
+from panini.middleware import Middleware
+
+
+class PassMiddleware(Middleware):
+    async def send_any(self, subject: str, message, send_func, *args, **kwargs):
+        return await send_func(subject, message, *args, **kwargs)
+
+    async def listen_any(self, msg, callback):
+        return await callback(msg)
+
+
+class ListenPublishOnlyMiddleware(Middleware):
+    async def listen_publish(self, msg, callback):
+        return await callback(msg)
+
+
+async def callback(msg):
+    return None
+
+
+async def publish(subject: str, message, **kwargs):
+    return None
+
+
+async def measure(chain, args: tuple, messages: int) -> float:
+    start = time.perf_counter()
+    for _ in range(messages):
+        await chain(*args)
+    return (time.perf_counter() - start) / messages * 1e9
+
+
+async def run(messages: int, middlewares_counts: tuple):
+    msg = Msg(None, subject="benchmark.listen", data=b"{}")
+    request_msg = Msg(None, subject="benchmark.listen", reply="inbox", data=b"{}")
+
+    print(f"{'middlewares':>11} {'listen':>10} {'request':>10} {'publish':>10}   ns/msg")
+    baseline = None
+    for count in middlewares_counts:
+        manager = MiddlewareManager()
+        for _ in range(count):
+            manager.add_middleware(PassMiddleware)
+        listen_publish, listen_request = manager.compile_listen_chains(callback)
+        results = (
+            await measure(listen_publish, (msg,), messages),
+            await measure(listen_request, (request_msg,), messages),
+            await measure(manager.compile_chain(publish, "send_publish_middleware"), ("subject", {}), messages),
+        )
+        baseline = baseline or results
+        print(f"{count:>11} " + " ".join(f"{value:>10.0f}" for value in results))
+
+    # a middleware with listen_publish only adds nothing to requests and publishes
+    manager = MiddlewareManager()
+    manager.add_middleware(ListenPublishOnlyMiddleware)
+    _, listen_request = manager.compile_listen_chains(callback)
+    result = await measure(listen_request, (request_msg,), messages)
+    print(f"\nlisten_publish only middleware, request: {result:.0f} ns/msg (no middlewares: {baseline[1]:.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, (0, 1, 3, 10)))
+
+
+if __name__ == "__main__":
+    main()
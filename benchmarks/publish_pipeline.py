@@ -0,0 +1,74 @@
+"""
+Compares publish throughput (msgs/sec) of the default publish path and the publish pipeline.
+Requires a NATS broker:
+
+    python -m benchmarks.publish_pipeline --messages 100000 --force-every 100
+"""
+import argparse
+import asyncio
+import time
+
+from panini.managers.nats_client import NATSClient
+
+
+async def measure(
+        use_pipeline: bool,
+        messages: int,
+        force_every: int,
+        host: str,
+        port: int,
+) -> float:
+    nats_client = NATSClient(
+        host=host,
+        port=port,
+        servers=None,
+        client_nats_name=f"publish_benchmark_{'pipeline' if use_pipeline else 'default'}",
+        loop=asyncio.get_event_loop(),
+        allow_reconnect=False,
+        publish_pipeline=use_pipeline,
+    )
+    await nats_client._establish_connection()
+    message = {"key1": "value1", "key2": 2, "key3": [1, 2, 3]}
+
+    start = time.perf_counter()
+    for i in range(1, messages + 1):
+        force = bool(force_every) and i % force_every == 0
+        await nats_client._publish("benchmark.publish", message, force=force)
+    if nats_client.publish_pipeline is not None:
+        await nats_client.publish_pipeline.flush()
+    else:
+        await nats_client.client.flush()
+    duration = time.perf_counter() - start
+
+    await nats_client.client.close()
+    return messages / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--force-every", type=int, default=0, help="publish every N-th message with force=True")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4222)
+    args = parser.parse_args()
+
+    results = {}
+    for name, use_pipeline in (("default", False), ("pipeline", True)):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        results[name] = loop.run_until_complete(
+            measure(use_pipeline, args.messages, args.force_every, args.host, args.port)
+        )
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+    for name, rate in results.items():
+        print(f"{name:>10}: {rate:12.0f} msgs/sec")
+    print(f"{'speedup':>10}: {results['pipeline'] / results['default']:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compares cross-thread publish throughput and request latency of SyncBridge with the per-call approach:
+call_soon_threadsafe for every published message and a thread-local event loop waiting for every request
+in an executor thread. Requires a NATS broker:
+
+    python -m benchmarks.sync_bridge --requests 2000 --messages 100000
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from panini.managers.event_manager import Listen
+from panini.managers.nats_client import NATSClient
+
+
+def per_call_publish(nats_client: NATSClient, tasks: list, subject: str, message):
+    nats_client.loop.call_soon_threadsafe(
+        lambda: tasks.append(asyncio.ensure_future(nats_client.publish(subject, message)))
+    )
+
+
+def per_call_request(nats_client: NATSClient, thread_loop: asyncio.AbstractEventLoop, subject: str, message):
+    async def request():
+        fut = asyncio.run_coroutine_threadsafe(nats_client.request(subject, message), nats_client.loop)
+        finished = threading.Event()
+        fut.add_done_callback(lambda _: finished.set())
+        await asyncio.get_event_loop().run_in_executor(None, finished.wait)
+        return fut.result()
+
+    return thread_loop.run_until_complete(request())
+
+
+async def wait_publishes(nats_client: NATSClient, tasks: list):
+    await asyncio.gather(*tasks)
+    await nats_client.sync_bridge.close()
+    await nats_client.client.flush()
+
+
+def run_in_thread(func):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(func()))
+    thread.start()
+    return thread, result
+
+
+def measure_requests(nats_client: NATSClient, requests: int, message) -> dict:
+    thread_loop = asyncio.new_event_loop()
+    results = {}
+    for name, request in (
+            ("per call", lambda: per_call_request(nats_client, thread_loop, "benchmark.sync_bridge.echo", message)),
+            ("bridge", lambda: nats_client.sync_bridge.request("benchmark.sync_bridge.echo", message)),
+    ):
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request()
+            latencies.append((time.perf_counter() - start) * 1e6)
+        results[name] = statistics.median(latencies)
+    thread_loop.close()
+    return results
+
+
+def measure_publishes(nats_client: NATSClient, messages: int, message) -> dict:
+    results = {}
+    tasks = []
+    for name, publish in (
+            ("per call", lambda: per_call_publish(nats_client, tasks, "benchmark.sync_bridge.publish", message)),
+            ("bridge", lambda: nats_client.sync_bridge.publish("benchmark.sync_bridge.publish", message)),
+    ):
+        start = time.perf_counter()
+        for _ in range(messages):
+            publish()
+        asyncio.run_coroutine_threadsafe(wait_publishes(nats_client, tasks), nats_client.loop).result()
+        results[name] = messages / (time.perf_counter() - start)
+    return results
+
+
+async def run(requests: int, messages: int, host: str, port: int):
+    nats_client = NATSClient(
+        host=host,
+        port=port,
+        servers=None,
+        client_nats_name="sync_bridge_benchmark",
+        loop=asyncio.get_running_loop(),
+        allow_reconnect=False,
+    )
+    await nats_client.connect()
+
+    async def echo(msg):
+        return msg.data
+
+    await nats_client.subscribe_new_subject(
+        Listen(callback=echo, subject="benchmark.sync_bridge.echo", _meta={})
+    )
+    await nats_client.client.flush()
+    message = {"key1": "value1", "key2": 2, "key3": [1, 2, 3]}
+
+    thread, latencies = run_in_thread(lambda: measure_requests(nats_client, requests, message))
+    await asyncio.get_running_loop().run_in_executor(None, thread.join)
+    thread, rates = run_in_thread(lambda: measure_publishes(nats_client, messages, message))
+    await asyncio.get_running_loop().run_in_executor(None, thread.join)
+    await nats_client.client.close()
+
+    print(f"{'':>8} {'request p50, us':>16} {'publish, msgs/sec':>18}")
+    for name in ("per call", "bridge"):
+        print(f"{name:>8} {latencies[name]:>16.0f} {rates[name]:>18.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4222)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.messages, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import asyncio
 import logging
 import os
+import signal
+import threading
 import uuid
 from types import FunctionType
 from typing import Optional, Callable
@@ -11,12 +13,15 @@ from panini.managers.nats_client import NATSClient
 from .exceptions import InitializingEventManagerError
 
 from .managers.event_manager import EventManager, Listen
+from .managers.stats_sampler import StatsSampler
 from .managers.task_manager import TaskManager
+from .managers.worker_manager import WorkerManager
 from .middleware.error import ErrorMiddleware
 from .utils import logger
 from .utils.helper import (
     get_app_root_path,
     create_client_code_by_hostname,
+    set_event_loop_policy,
 )
 
 _app = None
@@ -40,6 +45,14 @@ class App:
             custom_logger: logging.Logger = None,
             pending_bytes_limit=65536 * 1024 * 10,
             ignore_tasks_exceptions: bool = True,
+            max_in_flight: int = None,
+            publish_pipeline: bool = False,
+            dispatch_subjects: list = None,
+            event_loop: str = "asyncio",
+            drain_timeout: float = 10,
+            stats_interval: float = None,
+            stats_registry=None,
+            connections: int = 1,
             **kwargs
     ):
         """
@@ -57,6 +70,23 @@ class App:
         :param logger_required: Is logger required for the project (if not - EmptyLogger will be provided)
         :param logger_files_path: main path for logs
         :param logger_in_separate_process: use log in the same or in different process
+        :param max_in_flight: default limit of concurrently handled messages per listener, None - unlimited.
+                              Can be overridden for a single listener by @app.listen(..., max_in_flight=N)
+        :param publish_pipeline: high-throughput publish mode - messages are buffered and written in bursts,
+                                 tuned by publish_buffer_size and publish_flush_interval kwargs
+        :param dispatch_subjects: wildcard subjects, e.g. ["orders.>"]. Listeners covered by one of them share
+                                  a single NATS subscription and are routed in-process by a subject trie
+        :param event_loop: "asyncio" (default) or "uvloop", falls back to asyncio if uvloop is not installed
+        :param drain_timeout: on SIGTERM or app.stop() listeners are unsubscribed and the app waits up to
+                              drain_timeout seconds for in-flight handlers before the connection is closed
+        :param stats_interval: seconds between subscription stats samples (pending messages and bytes, delivered
+                               and dropped counts) published on panini_events.<service>.<client>.stats,
+                               None - disabled
+        :param stats_registry: prometheus_client CollectorRegistry, subscription stats and circuit breaker states
+                               are set to its gauges
+        :param connections: number of NATS connections, each one with its own socket and parser. Subscriptions are
+                            spread over them by subject hash, connection_lanes kwarg ({subject pattern: index})
+                            places subscriptions, publishes and requests of the subject on a dedicated connection
         """
 
         try:
@@ -66,7 +96,13 @@ class App:
                 self.client_nats_name = client_nats_name
             os.environ["CLIENT_NATS_NAME"] = self.client_nats_name
 
-            self.loop = asyncio.get_event_loop()
+            self.event_loop = set_event_loop_policy(event_loop)
+            try:
+                self.loop = asyncio.get_event_loop()
+            except RuntimeError:
+                # a new event loop policy doesn't create a loop on demand
+                self.loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self.loop)
 
             self.service_name = service_name
 
@@ -83,6 +119,11 @@ class App:
                 max_reconnect_attempts=max_reconnect_attempts,
                 reconnecting_time_wait=reconnecting_time_sleep,
                 pending_bytes_limit=pending_bytes_limit,
+                max_in_flight=max_in_flight,
+                publish_pipeline=publish_pipeline,
+                dispatch_subjects=dispatch_subjects,
+                drain_timeout=drain_timeout,
+                connections=connections,
                 **kwargs
             )
 
@@ -124,10 +165,21 @@ class App:
             self.http_server = None
             self.http = None
 
+            self._app_tasks = []
+            self._stopped = None
+            self._stopping = False
+
             self.on_start_task = self._task_manager.register_on_start_task
             self.task = self._task_manager.register_task
             self.timer_task = self._task_manager.register_interval_task
 
+            self.stats_sampler = None
+            if stats_interval:
+                self.stats_sampler = StatsSampler(self.nats, self.service_name, registry=stats_registry)
+                self.timer_task(stats_interval)(self.stats_sampler.publish_stats)
+            if self.nats.circuit_breakers:
+                self.nats.circuit_breakers.report(self.nats, self.service_name, registry=stats_registry)
+
             global _app
             _app = self
 
@@ -163,7 +215,8 @@ class App:
 
     def add_filters(self, include: list = None, exclude: list = None):
         """
-        Allows to listen subject only if subject include or exclude string from lists in agrs
+        Allows to listen subject only if subject include or exclude string from lists in agrs,
+        entries with `*` or `>` wildcards are matched as NATS subject patterns
         """
         return self.nats.add_filters(include, exclude)
 
@@ -272,6 +325,29 @@ class App:
             **kwargs
         )
 
+    async def publish_many(
+            self,
+            items,
+            batch_size: int = None,
+            headers: dict = None,
+            *args,
+            **kwargs
+    ):
+        """
+        Bulk publish: send middlewares run once per batch, all messages are serialized
+        and sent with a single flush. Returns when the whole batch has reached the socket
+        :param items: (subject, message[, headers]) tuples or an async iterator of them
+        :param batch_size: max messages per batch, must be positive
+        :param headers: headers for every message of the batch
+        """
+        return await self.nats.publish_many(
+            items=items,
+            batch_size=batch_size,
+            headers=headers,
+            *args,
+            **kwargs
+        )
+
     def publish_sync(
             self,
             subject: str,
@@ -312,6 +388,57 @@ class App:
             **kwargs
         )
 
+    async def request_many(
+            self,
+            subjects_or_messages,
+            message=None,
+            timeout: float = 10,
+            max_concurrency: int = None,
+            min_responses: int = None,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ):
+        """
+        Scatter-gather request to many subjects, returns list of RequestResult in order of arrival
+        :param subjects_or_messages: subjects to request with the same message or (subject, message) tuples
+        :param message: message for items given as subjects only
+        :param timeout: deadline in seconds for the whole scatter-gather
+        :param max_concurrency: max number of requests in flight
+        :param min_responses: "first K wins" - cancel the remaining requests after K successful responses
+        """
+        return await self.nats.request_many(
+            subjects_or_messages,
+            message=message,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            min_responses=min_responses,
+            response_data_type=response_data_type,
+            headers=headers,
+        )
+
+    def request_many_iter(
+            self,
+            subjects_or_messages,
+            message=None,
+            timeout: float = 10,
+            max_concurrency: int = None,
+            min_responses: int = None,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ):
+        """
+        Same as request_many, but an async iterator that yields RequestResult as soon as it arrives
+        """
+        return self.nats.request_many_iter(
+            subjects_or_messages,
+            message=message,
+            timeout=timeout,
+            max_concurrency=max_concurrency,
+            min_responses=min_responses,
+            response_data_type=response_data_type,
+            headers=headers,
+        )
+
     def request_sync(
             self,
             subject: str,
@@ -394,6 +521,97 @@ class App:
     async def unsubscribe_subject(self, subject: str):
         return await self.nats.unsubscribe_subject(subject)
 
+    def subscription_stats(self):
+        """
+        In-flight handlers count and pending queue depth for each subscription
+        """
+        return self.nats.subscription_stats()
+
+    def cache_stats(self):
+        """
+        Hits, misses and size of reply caches of listeners with cache_ttl
+        """
+        return self.nats.cache_stats()
+
+    def invalidate_cache(self, subject: str = None, message=None) -> int:
+        """
+        Removes cached responses of listeners with cache_ttl
+        :param subject: request subject or a pattern with wildcards, None - all subjects
+        :param message: removes the response to this message only, must be encoded like the requester does it
+        :return: number of removed responses
+        """
+        return self.nats.invalidate_cache(subject, message)
+
+    def request_cache_stats(self):
+        """
+        Round trips done and saved by request coalescing and the request cache
+        """
+        return self.nats.request_cache.stats()
+
+    def hedge_stats(self):
+        """
+        Hedged requests: hedge rate, wins of hedges and "auto" delays by subject
+        """
+        return self.nats.request_hedger.stats()
+
+    def breaker_stats(self):
+        """
+        State, failure rate over the window and rejected requests of circuit breakers by subject pattern
+        """
+        return self.nats.circuit_breakers.stats()
+
+    def set_rate_limit(self, subject_pattern: str, rate: float, burst: float = None, overflow: str = "wait"):
+        """
+        Limits publishes and requests of subjects matched by the pattern with a token bucket shared by them
+        :param subject_pattern: subject pattern, `*` and `>` wildcards are supported
+        :param rate: messages per second
+        :param burst: max number of messages sent at once after a pause, max(1, rate) by default
+        :param overflow: "wait", "drop" or "raise" (RateLimitExceededError) when the limit is reached,
+                         requests are never dropped, "drop" raises for them
+        """
+        self.nats.rate_limiter.set_limit(subject_pattern, rate, burst, overflow)
+
+    def remove_rate_limit(self, subject_pattern: str) -> bool:
+        return self.nats.rate_limiter.remove_limit(subject_pattern)
+
+    def rate_limit_stats(self):
+        """
+        Allowed, delayed, dropped and rejected messages by rate limit pattern
+        """
+        return self.nats.rate_limiter.stats()
+
+    def priority_stats(self):
+        """
+        Running handlers and per priority lane queue depth, dispatched count and wait times,
+        None without priority_concurrency
+        """
+        if self.nats.priority_scheduler is None:
+            return None
+        return self.nats.priority_scheduler.stats()
+
+    def executor_stats(self):
+        """
+        Size, busy threads and queue depth of the pool for executor="thread" listeners
+        """
+        return self.nats.executor_manager.stats()
+
+    def connection_stats(self):
+        """
+        NATS connection health: disconnects, reconnect durations, bytes buffered during an outage and RTT,
+        messages and bytes of every connection
+        """
+        return {
+            **self.nats.connection_monitor.stats(),
+            "connections": self.nats.connections.stats(),
+        }
+
+    def sync_client(self):
+        """
+        Thread-safe SyncBridge for synchronous code running in other threads (Flask, Celery, executor="thread"
+        listeners): request() blocks the calling thread, publish() is batched and doesn't block
+        """
+        return self.nats.sync_bridge
+
     def add_middleware(self, cls, *args, **kwargs):
         return self.nats.middleware_manager.add_middleware(cls, *args, **kwargs)
 
@@ -406,7 +624,123 @@ class App:
             )
         )
 
-    def start(self):
+    def start(self, workers: int = 1):
+        """
+        Runs the app in the current thread until it is stopped, for async applications see App.run()
+        :param workers: number of worker processes. With workers > 1 the current process becomes a supervisor
+                        that forks workers, restarts crashed ones and forwards SIGTERM/SIGINT to them.
+                        Each worker holds its own NATS connection in the allocation_queue_group
+                        (service_name if not set) and logs through the logger process
+        """
+        self._setup(in_separate_process=self.logger_in_separate_process or workers > 1)
+
+        if workers > 1:
+            self._start_workers(workers)
+        else:
+            self._start()
+
+    async def run(self):
+        """
+        Runs the app inside the running event loop until app.stop() is called:
+        asyncio.run(app.run()). Unlike App.start(), asyncio is not patched for nested loops,
+        so *_sync functions can be called from other threads only
+        """
+        await self.serve()
+        self._add_stop_signal_handler()
+        try:
+            waiters = [asyncio.ensure_future(self._stopped.wait())]
+            if not self._ignore_tasks_exceptions:
+                waiters.extend(self._app_tasks)
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_EXCEPTION)
+            waiters[0].cancel()
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    await self.stop()
+                    raise task.exception()
+        finally:
+            try:
+                self.loop.remove_signal_handler(signal.SIGTERM)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Windows event loops or not the main thread, no handler was installed
+                pass
+
+    async def serve(self):
+        """
+        Connects to NATS, runs on_start tasks, subscribes listeners, starts tasks and the HTTP server
+        in the running event loop and returns, for embedding the app into another asyncio application
+        """
+        self._setup(in_separate_process=self.logger_in_separate_process)
+        self._bind_loop(asyncio.get_running_loop())
+        self._stopped = asyncio.Event()
+
+        self.nats.set_listeners(
+            self._event_manager.subscriptions,
+            self._event_manager.js_subscriptions,
+        )
+        await self.nats.connect()
+        if self.nats.enable_js:
+            self.js = self.nats.js
+
+        for on_start in self._task_manager._on_start_tasks:
+            await on_start()
+
+        await self.nats.subscribe_listeners()
+        self.nats.print_connect()
+
+        self._start_event()
+        self._app_tasks = self._task_manager.create_tasks()
+        if self.http_server:
+            await self.http_server.start_site()
+
+    async def stop(self):
+        """
+        Stops the app gracefully: cancels app tasks, stops the HTTP server and listeners,
+        waits up to drain_timeout for in-flight handlers and flushes publishes before disconnect
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        for task in self._app_tasks:
+            task.cancel()
+        if self.http_server:
+            if self.http_server.serving:
+                # started by app.start(): web.run_app stops the server and drains NATS in _on_http_shutdown
+                self.http_server.stop_server()
+                await self._stopped.wait()
+                return
+            await self.http_server.cleanup()
+        await self.nats.disconnect()
+        self._stopped.set()
+
+    async def _on_http_shutdown(self, web_app):
+        # web.run_app of app.start() is shutting down, on SIGTERM (handled by aiohttp) or app.stop()
+        self._stopping = True
+        for task in self._app_tasks:
+            task.cancel()
+        await self.nats.disconnect()
+        self._stopped.set()
+
+    def _add_stop_signal_handler(self):
+        def on_sigterm():
+            if self._stopping:
+                logger.get_logger("panini").warning("Already stopping, waiting for in-flight handlers")
+                return
+            logger.get_logger("panini").warning("SIGTERM received, stopping")
+            asyncio.ensure_future(self.stop())
+
+        if threading.current_thread() is not threading.main_thread():
+            # signal handlers can be installed in the main thread only, the host application stops the app
+            logger.get_logger("panini").warning(
+                "The app runs outside the main thread, SIGTERM handler is not installed, call app.stop() to stop it"
+            )
+            return
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+        except NotImplementedError:
+            # no signal handlers in Windows event loops
+            pass
+
+    def _setup(self, in_separate_process: bool):
         if (
                 os.environ.get("PANINI_TEST_MODE")
                 and os.environ.get("PANINI_TEST_MODE_USE_ERROR_MIDDLEWARE", "false")
@@ -419,7 +753,7 @@ class App:
             self.add_middleware(
                 ErrorMiddleware, error=Exception, callback=exception_handler
             )
-        if self.logger_required and self.logger_in_separate_process:
+        if self.logger_required and in_separate_process:
             self.set_logger(
                 self.service_name,
                 self.app_root_path,
@@ -428,6 +762,14 @@ class App:
                 self.client_nats_name,
             )
 
+    def _bind_loop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.nats.loop = loop
+        if self.http_server:
+            self.http_server.loop = loop
+
+    def _start(self):
+        self.nats.enable_nested_loop()
         self.nats.set_listeners(
             self._event_manager.subscriptions,
             self._event_manager.js_subscriptions,
@@ -450,16 +792,74 @@ class App:
         self._start_event()
 
         # prepare all tasks from task_manager
-        self._task_manager.create_tasks()
+        self._app_tasks = self._task_manager.create_tasks()
         tasks = asyncio.all_tasks(loop)
 
         # start app, with http_server if required
+        self._stopped = asyncio.Event()
         if self.http_server:
+            # aiohttp handles SIGTERM itself, NATS is drained on the server shutdown
+            self.http_server.web_app.on_shutdown.append(self._on_http_shutdown)
             self.http_server.start_server()
         else:
-            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=self._ignore_tasks_exceptions))
-
-
+            self._add_stop_signal_handler()
+            loop.run_until_complete(self._wait_stopped(tasks))
+
+    async def _wait_stopped(self, tasks: set):
+        # runs until tasks are finished (an exception is raised unless ignored) or the app is stopped
+        gathered = asyncio.gather(*tasks, return_exceptions=self._ignore_tasks_exceptions)
+        stopped = asyncio.ensure_future(self._stopped.wait())
+        await asyncio.wait([gathered, stopped], return_when=asyncio.FIRST_COMPLETED)
+        if not stopped.done():
+            stopped.cancel()
+            return gathered.result()
+        gathered.cancel()
+        try:
+            await gathered
+        except asyncio.CancelledError:
+            pass
+
+    def _start_workers(self, workers: int):
+        self.worker_manager = WorkerManager(
+            workers,
+            run_worker=self._start_worker,
+            on_worker_exit=self._flush_worker_logs,
+            stop_timeout=self.nats.drain_timeout + 5,
+        )
+        try:
+            self.worker_manager.run()
+        finally:
+            if self.log_stop_event is not None:
+                self.log_stop_event.set()
+
+    def _start_worker(self, index: int):
+        # the event loop of the supervisor must not be shared between forked processes
+        self._bind_loop(asyncio.new_event_loop())
+        asyncio.set_event_loop(self.loop)
+        if self.http_server:
+            self.http_server.web_server_params.setdefault("reuse_port", True)
+
+        self.client_nats_name = f"{self.client_nats_name}__worker{index}"
+        self.nats.client_nats_name = self.client_nats_name
+        os.environ["CLIENT_NATS_NAME"] = self.client_nats_name
+        if not self.nats.queue:
+            self.nats.queue = self.service_name
+
+        self.loop.create_task(self._supervisor_watcher(os.getppid()))
+        self._start()
+
+    async def _supervisor_watcher(self, supervisor_pid: int):
+        # workers must not outlive a killed supervisor
+        while True:
+            await asyncio.sleep(1)
+            if os.getppid() != supervisor_pid:
+                logger.get_logger("panini").warning("Supervisor process has gone, stopping the worker")
+                os.kill(os.getpid(), signal.SIGTERM)
+
+    def _flush_worker_logs(self):
+        if self.log_listener_queue is not None:
+            self.log_listener_queue.close()
+            self.log_listener_queue.join_thread()
 
 
 def get_app() -> App:
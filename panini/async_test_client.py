@@ -13,6 +13,7 @@ from nats.aio.client import Client as NATS
 
 from .exceptions import TestClientError
 from .utils.helper import start_process
+from .utils.subject_index import pattern_covers
 from nats.aio.client import Msg
 
 
@@ -89,29 +90,7 @@ def get_logger_files_path(folder: str = "test_logs", remove_if_exist: bool = Fal
 
 
 def is_subject_matches_pattern(subject: str, pattern: str) -> bool:
-    subject_parts = subject.split(".")
-    pattern_parts = pattern.split(".")
-    if ">" in pattern:
-        assert pattern[-1] == ">", "> must can be only the last element of subject!"
-        gt_position = pattern_parts.index(">")
-        return is_subject_matches_pattern(
-            ".".join(subject_parts[:gt_position]),
-            ".".join(pattern_parts[:gt_position]),
-        )
-
-    if ">" in subject_parts:
-        return False
-
-    if len(subject_parts) != len(pattern_parts):
-        return False
-
-    for index, part in enumerate(pattern_parts):
-        if part == "*":
-            pass
-        elif part != subject_parts[index]:
-            return False
-
-    return True
+    return pattern_covers(pattern, subject)
 
 
 class AsyncTestClient:
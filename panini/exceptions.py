@@ -123,4 +123,9 @@ class JetStreamNotEnabledError(BaseError):
     pass
 
 
+class RateLimitExceededError(BaseError):
+    pass
+
 
+class CircuitOpenError(BaseError):
+    pass
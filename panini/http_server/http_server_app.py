@@ -24,6 +24,9 @@ class HTTPServer:
         self.port = port
         self.web_server_params = web_server_params
         self.loop = loop
+        self.runner = None
+        # web.run_app of start_server is running
+        self.serving = False
 
         if web_app:
             self.web_app = web_app
@@ -37,6 +40,45 @@ class HTTPServer:
         self.web_app.add_routes(self.routes)
         if version.parse(aiohttp.__version__) >= version.parse("3.8.0"):
             self.web_server_params["loop"] = self.loop
-        web.run_app(
-            self.web_app, host=self.host, port=self.port, **self.web_server_params
+        self.serving = True
+        try:
+            web.run_app(
+                self.web_app, host=self.host, port=self.port, **self.web_server_params
+            )
+        finally:
+            self.serving = False
+
+    def stop_server(self):
+        """
+        Stops web.run_app of start_server from the running loop, like its signal handlers do it,
+        the server is cleaned up and on_shutdown handlers are called by web.run_app
+        """
+        def raise_graceful_exit():
+            raise web.GracefulExit()
+
+        self.loop.call_soon(raise_graceful_exit)
+
+    async def start_site(self):
+        """
+        Starts the server in the running loop, used by App.run()
+        """
+        site_params = ("ssl_context", "backlog", "reuse_address", "reuse_port", "shutdown_timeout")
+        runner_params = {
+            key: value for key, value in self.web_server_params.items()
+            if key not in site_params + ("loop", "print", "handle_signals")
+        }
+        self.web_app.add_routes(self.routes)
+        self.runner = web.AppRunner(self.web_app, handle_signals=False, **runner_params)
+        await self.runner.setup()
+        site = web.TCPSite(
+            self.runner,
+            host=self.host,
+            port=self.port,
+            **{key: value for key, value in self.web_server_params.items() if key in site_params}
         )
+        await site.start()
+
+    async def cleanup(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
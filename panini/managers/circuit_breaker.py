@@ -0,0 +1,225 @@
+import asyncio
+import collections
+import time
+from typing import Callable, Dict, Optional
+
+from nats.errors import TimeoutError as NATSClientTimeoutError
+from prometheus_client import CollectorRegistry, Gauge
+
+from panini.exceptions import CircuitOpenError
+from panini.utils.logger import get_logger
+from panini.utils.subject_index import SubjectRules
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, HALF_OPEN, OPEN)
+
+SUCCESS, FAILURE, TIMEOUT = 0, 1, 2
+
+DEFAULTS = {
+    "failure_rate": 0.5,
+    "window": 20,
+    "min_requests": 10,
+    "open_timeout": 5.0,
+    "half_open_probes": 1,
+}
+
+
+class _Breaker:
+    def __init__(
+            self,
+            pattern: str,
+            on_transition: Callable,
+            failure_rate: float,
+            window: int,
+            min_requests: int,
+            open_timeout: float,
+            half_open_probes: int,
+    ):
+        assert 0 < failure_rate <= 1, f"failure_rate of {pattern} must be between 0 and 1"
+        assert 0 < min_requests <= window, f"min_requests of {pattern} must be between 1 and window"
+        self.pattern = pattern
+        self.on_transition = on_transition
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.open_timeout = open_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        # outcomes of the last requests, counts are kept up to date to make every request O(1)
+        self.outcomes = collections.deque(maxlen=window)
+        self.counts = [0, 0, 0]
+        self.rejected = 0
+        self.transitions = 0
+
+    @property
+    def current_failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return (self.counts[FAILURE] + self.counts[TIMEOUT]) / len(self.outcomes)
+
+    async def call(self, subject: str, coro):
+        try:
+            probe = self._admit(subject)
+        except CircuitOpenError:
+            coro.close()
+            raise
+        try:
+            response = await coro
+        except asyncio.CancelledError:
+            if probe is not None and probe == self.transitions:
+                self.probes -= 1
+            raise
+        except (asyncio.TimeoutError, NATSClientTimeoutError):
+            self._record(TIMEOUT, probe, subject)
+            raise
+        except Exception:
+            self._record(FAILURE, probe, subject)
+            raise
+        self._record(SUCCESS, probe, subject)
+        return response
+
+    def _admit(self, subject: str) -> Optional[int]:
+        """
+        Returns the transitions count of the half-open state for a probe, None for other requests,
+        raises CircuitOpenError to fail fast
+        """
+        if self.state == CLOSED:
+            return None
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_timeout:
+            self._transition(HALF_OPEN, subject)
+        if self.state == HALF_OPEN and self.probes < self.half_open_probes:
+            self.probes += 1
+            return self.transitions
+        self.rejected += 1
+        raise CircuitOpenError(f"Circuit breaker {self.pattern} is {self.state}, subject: {subject}")
+
+    def _record(self, outcome: int, probe: Optional[int], subject: str):
+        if probe is not None:
+            if probe != self.transitions:
+                # the half-open state this probe was sent in is over
+                return
+            self.probes -= 1
+            if outcome != SUCCESS:
+                self._open(subject)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_probes:
+                self.outcomes.clear()
+                self.counts = [0, 0, 0]
+                self._transition(CLOSED, subject)
+            return
+        if self.state != CLOSED:
+            # requests sent before the breaker opened
+            return
+        if len(self.outcomes) == self.outcomes.maxlen:
+            self.counts[self.outcomes[0]] -= 1
+        self.outcomes.append(outcome)
+        self.counts[outcome] += 1
+        if outcome != SUCCESS and len(self.outcomes) >= self.min_requests \
+                and self.current_failure_rate >= self.failure_rate:
+            self._open(subject)
+
+    def _open(self, subject: str):
+        self.opened_at = time.monotonic()
+        self._transition(OPEN, subject)
+
+    def _transition(self, state: str, subject: str):
+        previous, self.state = self.state, state
+        self.probes = 0
+        self.probe_successes = 0
+        self.transitions += 1
+        if self.on_transition is not None:
+            self.on_transition({
+                "pattern": self.pattern,
+                "subject": subject,
+                "state": state,
+                "previous_state": previous,
+                "failure_rate": self.current_failure_rate,
+            })
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": self.current_failure_rate,
+            "requests": len(self.outcomes),
+            "failures": self.counts[FAILURE],
+            "timeouts": self.counts[TIMEOUT],
+            "rejected": self.rejected,
+            "transitions": self.transitions,
+        }
+
+
+class CircuitBreakers:
+    """
+    Circuit breakers of app.request by subject pattern, all subjects matched by a pattern share its breaker.
+    A breaker opens when the rate of errors and timeouts over the last `window` requests reaches failure_rate,
+    requests fail fast with CircuitOpenError while it is open. After open_timeout it is half-open:
+    half_open_probes requests are let through, their success closes it, a failure opens it again
+    """
+
+    def __init__(self, rules: Dict[str, dict] = None, on_transition: Callable[[dict], None] = None):
+        """
+        :param rules: breaker options by subject pattern, e.g. {"payments.>": {"failure_rate": 0.5,
+                      "window": 20, "min_requests": 10, "open_timeout": 5, "half_open_probes": 1}},
+                      missing options are taken from DEFAULTS
+        :param on_transition: called with a transition event dict when a breaker changes its state
+        """
+        self.on_transition = on_transition
+        self.logger = get_logger("panini")
+        self.nats = None
+        self.service_name = None
+        self.gauge: Optional[Gauge] = None
+        breakers = {}
+        for pattern, options in (rules or {}).items():
+            unknown = set(options) - set(DEFAULTS)
+            assert not unknown, f"Unknown circuit breaker options {unknown} for {pattern}"
+            breakers[pattern] = _Breaker(pattern, self._on_transition, **{**DEFAULTS, **options})
+        self.rules = SubjectRules(breakers)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def report(self, nats_client, service_name: str, registry: Optional[CollectorRegistry] = None):
+        """
+        Publishes transition events on panini_events.<service>.<client>.breaker and sets breaker states
+        (0 - closed, 1 - half open, 2 - open) to the panini_circuit_breaker_state gauge of the registry
+        """
+        self.nats = nats_client
+        self.service_name = service_name
+        if registry is not None:
+            self.gauge = Gauge(
+                "panini_circuit_breaker_state",
+                "Circuit breaker state, 0 - closed, 1 - half open, 2 - open",
+                labelnames=("app_name", "client_nats_name", "pattern"),
+                registry=registry,
+            )
+            for pattern in self.rules.rules:
+                self.gauge.labels(service_name, nats_client.client_nats_name, pattern).set(0)
+
+    @property
+    def subject(self) -> str:
+        return f"panini_events.{self.service_name}.{self.nats.client_nats_name}.breaker"
+
+    def _on_transition(self, event: dict):
+        self.logger.warning(
+            f"Circuit breaker {event['pattern']}: {event['previous_state']} -> {event['state']}, "
+            f"failure rate {event['failure_rate']:.2f}"
+        )
+        if self.gauge is not None:
+            self.gauge.labels(self.service_name, self.nats.client_nats_name, event["pattern"]).set(
+                STATES.index(event["state"])
+            )
+        if self.nats is not None and self.nats.client.is_connected:
+            asyncio.ensure_future(self.nats._publish(self.subject, event))
+        if self.on_transition is not None:
+            self.on_transition(event)
+
+    def match(self, subject: str) -> Optional[_Breaker]:
+        return self.rules.match(subject)
+
+    def stats(self) -> Dict[str, dict]:
+        return {pattern: breaker.stats() for pattern, breaker in self.rules.rules.items()}
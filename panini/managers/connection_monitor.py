@@ -0,0 +1,185 @@
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, Optional, Union
+
+from nats.aio.subscription import Subscription
+from nats.errors import SlowConsumerError
+
+from panini.utils.logger import get_logger
+
+POLICIES = ("reconnect", "exit")
+
+
+class ConnectionMonitor:
+    """
+    Connection health driven by nats-py disconnected, reconnected, closed and error callbacks.
+    Keeps outage and RTT metrics and decides whether the process exits when the connection is lost
+    """
+
+    def __init__(
+            self,
+            policy: Union[str, Callable[[dict], bool]] = "reconnect",
+            rtt_interval: float = 10.0,
+    ):
+        """
+        :param policy: "reconnect" - nats-py reconnects and buffers publishes, the process exits with code 99
+                       when the connection is closed (reconnect attempts are exhausted);
+                       "exit" - exit with code 99 as soon as the connection is lost;
+                       callable(stats) -> bool - called on disconnect and on every failed reconnect attempt
+                       with connection stats, True - exit
+        :param rtt_interval: seconds between RTT measurements, None or 0 - disabled
+        """
+        assert callable(policy) or policy in POLICIES, f"policy must be one of {POLICIES} or a callable"
+        self.policy = policy
+        self.rtt_interval = rtt_interval
+        self.logger = get_logger("panini")
+        self.client = None
+        self.closing = False
+
+        self.disconnects = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.outage_started: Optional[float] = None
+        self.last_reconnect_duration: Optional[float] = None
+        self.max_reconnect_duration = 0.0
+        self.outage_total = 0.0
+        self.max_buffered_bytes = 0
+        self.rtt: Optional[float] = None
+        # messages dropped by nats-py because pending_bytes_limit was reached, by subscription
+        self.slow_consumer_drops: Dict[Subscription, int] = {}
+        self._rtt_task: Optional[asyncio.Task] = None
+
+    def connect_kwargs(self, kwargs: dict) -> dict:
+        """
+        Returns nats-py connect callbacks, callbacks given in kwargs are called after the monitor ones
+        """
+        return {
+            "disconnected_cb": self._chain(self._on_disconnected, kwargs.get("disconnected_cb")),
+            "reconnected_cb": self._chain(self._on_reconnected, kwargs.get("reconnected_cb")),
+            "closed_cb": self._chain(self._on_closed, kwargs.get("closed_cb")),
+            "error_cb": self._chain(self._on_error, kwargs.get("error_cb")),
+        }
+
+    @staticmethod
+    def _chain(callback, user_callback):
+        if user_callback is None:
+            return callback
+
+        async def chained(*args):
+            await callback(*args)
+            await user_callback(*args)
+
+        return chained
+
+    def start(self, client):
+        self.client = client
+        self.closing = False
+        if self.rtt_interval:
+            self._rtt_task = asyncio.ensure_future(self._measure_rtt_periodically())
+
+    def stop(self):
+        """
+        Called before the connection is closed on purpose, so the closed callback doesn't exit the process
+        """
+        self.closing = True
+        if self._rtt_task is not None:
+            self._rtt_task.cancel()
+            self._rtt_task = None
+
+    @property
+    def buffered_bytes(self) -> int:
+        if self.client is None:
+            return 0
+        return self.client.pending_data_size
+
+    def sample_buffer(self):
+        buffered = self.buffered_bytes
+        if buffered > self.max_buffered_bytes:
+            self.max_buffered_bytes = buffered
+
+    def stats(self) -> dict:
+        if self.outage_started is not None:
+            self.sample_buffer()
+        return {
+            "connected": self.client is not None and self.client.is_connected,
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "outage": None if self.outage_started is None else time.monotonic() - self.outage_started,
+            "outage_total": self.outage_total,
+            "last_reconnect_duration": self.last_reconnect_duration,
+            "max_reconnect_duration": self.max_reconnect_duration,
+            "buffered_bytes": self.buffered_bytes,
+            "max_buffered_bytes": self.max_buffered_bytes,
+            "rtt": self.rtt,
+        }
+
+    async def _on_disconnected(self):
+        if self.closing:
+            return
+        self.disconnects += 1
+        self.outage_started = time.monotonic()
+        self.sample_buffer()
+        self.logger.warning("NATS connection lost")
+        self._apply_policy()
+
+    async def _on_reconnected(self):
+        self.reconnects += 1
+        if self.outage_started is not None:
+            duration = time.monotonic() - self.outage_started
+            self.outage_started = None
+            self.last_reconnect_duration = duration
+            self.max_reconnect_duration = max(self.max_reconnect_duration, duration)
+            self.outage_total += duration
+            self.logger.warning(f"NATS connection restored in {duration:.3f}s")
+
+    async def _on_closed(self):
+        if self.closing:
+            return
+        self.logger.error("NATS connection closed")
+        self._exit()
+
+    async def _on_error(self, e):
+        if isinstance(e, SlowConsumerError):
+            # reported for every dropped message, so it's counted instead of logged
+            # sids are unique per connection only
+            if e.sub not in self.slow_consumer_drops:
+                self.logger.warning(f"Slow consumer, messages are dropped, subject: {e.subject}")
+            self.slow_consumer_drops[e.sub] = self.slow_consumer_drops.get(e.sub, 0) + 1
+            return
+        self.errors += 1
+        self.last_error = repr(e)
+        self.logger.warning(f"NATS connection error: {e!r}")
+        if self.outage_started is not None and not self.closing:
+            self.sample_buffer()
+            if callable(self.policy):
+                self._apply_policy()
+
+    def _apply_policy(self):
+        if self.policy == "exit" or (callable(self.policy) and self.policy(self.stats())):
+            self._exit()
+
+    def _exit(self):
+        # SystemExit is raised by a loop callback, so it stops the event loop instead of nats-py internals
+        asyncio.get_event_loop().call_soon(sys.exit, 99)
+
+    async def _measure_rtt_periodically(self):
+        while True:
+            await asyncio.sleep(self.rtt_interval)
+            if not self.client.is_connected:
+                continue
+            try:
+                self.rtt = await self._measure_rtt()
+            except Exception as e:
+                self.logger.warning(f"RTT measurement failed: {e!r}")
+
+    async def _measure_rtt(self) -> float:
+        if hasattr(self.client, "rtt"):
+            return await self.client.rtt()
+        # flush sends PING and waits for PONG
+        started = time.perf_counter()
+        await self.client.flush(timeout=self.rtt_interval)
+        return time.perf_counter() - started
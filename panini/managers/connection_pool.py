@@ -0,0 +1,86 @@
+import asyncio
+import zlib
+from typing import Dict, List
+
+from nats.aio.client import Client as NATS
+
+from panini.utils.subject_index import SubjectRules
+
+
+class ConnectionPool:
+    """
+    NATS connections of the app, each one has its own socket, read loop and parser.
+    Subscriptions are placed by lanes or by subject hash, publishes and requests go through the lane
+    of the subject, the primary connection (0) by default. Messages of the same subject always use
+    the same connection, so their order is kept
+    """
+
+    def __init__(self, size: int = 1, lanes: Dict[str, int] = None):
+        """
+        :param size: number of connections
+        :param lanes: connection index by subject pattern, e.g. {"ingest.>": 1, "control.>": 0},
+                      the first matching pattern in the dict order is applied
+        """
+        assert size >= 1, "connections must be a positive number"
+        for pattern, index in (lanes or {}).items():
+            assert 0 <= index < size, f"Connection lane {pattern} -> {index} is out of range, connections={size}"
+        self.size = size
+        self.lanes = SubjectRules(lanes)
+        self.clients: List[NATS] = []
+
+    @property
+    def primary(self) -> NATS:
+        return self.clients[0]
+
+    async def connect(self, **kwargs):
+        """
+        Opens all connections with the same nats-py connect kwargs, the connection index is added
+        to the name of all connections but the primary one
+        """
+        for index in range(self.size):
+            client = NATS()
+            connect_kwargs = dict(kwargs)
+            if index and connect_kwargs.get("name"):
+                connect_kwargs["name"] = f"{connect_kwargs['name']}__{index}"
+            await client.connect(**connect_kwargs)
+            self.clients.append(client)
+
+    def subscription_index(self, subject: str, connection: int = None) -> int:
+        if connection is not None:
+            assert 0 <= connection < self.size, f"connection={connection} is out of range, connections={self.size}"
+            return connection
+        if self.size == 1:
+            return 0
+        index = self.lanes.match(subject)
+        if index is None:
+            # crc32 instead of hash(), so a subject gets the same connection in every process
+            index = zlib.crc32(subject.encode()) % self.size
+        return index
+
+    def for_subscription(self, subject: str, connection: int = None) -> NATS:
+        return self.clients[self.subscription_index(subject, connection)]
+
+    def for_publish(self, subject: str) -> NATS:
+        if self.size == 1:
+            return self.clients[0]
+        return self.clients[self.lanes.match(subject, 0)]
+
+    async def flush(self):
+        await asyncio.gather(*(client.flush() for client in self.clients))
+
+    async def drain(self):
+        # the primary connection is the last one, its reply subscriptions may be used until then
+        await asyncio.gather(*(client.drain() for client in self.clients[1:]))
+        await self.primary.drain()
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "name": client.options.get("name"),
+                "connected": client.is_connected,
+                "subscriptions": len(client._subs),
+                "pending_bytes": client.pending_data_size,
+                **client.stats,
+            }
+            for client in self.clients
+        ]
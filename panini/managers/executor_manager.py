@@ -0,0 +1,264 @@
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from nats.aio.msg import Msg
+
+EXECUTORS = ("loop", "thread", "process")
+
+# callbacks of executor="process" listeners, pool processes are forked after registration and inherit them,
+# so closures and lambdas work and only a key is sent to a pool process with every message
+_process_callbacks: Dict[int, Callable] = {}
+_process_callback_keys = itertools.count()
+
+
+@dataclasses.dataclass
+class _SharedPayload:
+    name: str
+    size: int
+
+
+def _dumps(obj: Any, shm_threshold: int):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) < shm_threshold:
+        return data
+    shm = SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+    finally:
+        shm.close()
+    # the receiver unlinks the block, the resource tracker of the creator must not do it again at exit
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return _SharedPayload(shm.name, len(data))
+
+
+def _loads(payload):
+    if isinstance(payload, bytes):
+        return pickle.loads(payload)
+    # the receiver owns shared memory block and releases it
+    shm = SharedMemory(name=payload.name)
+    try:
+        buf = shm.buf[:payload.size]
+        try:
+            return pickle.loads(buf)
+        finally:
+            buf.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _discard(payload):
+    # frees the shared memory block of a payload that won't be loaded
+    if not isinstance(payload, _SharedPayload):
+        return
+    try:
+        shm = SharedMemory(name=payload.name)
+    except FileNotFoundError:
+        # already loaded by the receiver
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _discard_request(payload, future: concurrent.futures.Future):
+    # a cancelled call never ran, a failed one may have died before loading the message
+    if future.cancelled() or future.exception() is not None:
+        _discard(payload)
+
+
+def _discard_response(future: concurrent.futures.Future):
+    if not future.cancelled() and future.exception() is None:
+        _discard(future.result())
+
+
+def _detach(msg):
+    # NATS client and subscription objects can't be sent to another process
+    if isinstance(msg, Msg):
+        return dataclasses.replace(msg, _client=None)
+    if dataclasses.is_dataclass(msg) and hasattr(msg, "msgs"):
+        return dataclasses.replace(msg, msgs=[_detach(m) for m in msg.msgs])
+    return msg
+
+
+def _process_initializer(parent_pid: int):
+    def watch_parent():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(1)
+
+    threading.Thread(target=watch_parent, daemon=True).start()
+
+
+def _run_process_callback(key: int, payload, shm_threshold: int):
+    msg = _loads(payload)
+    return _dumps(_process_callbacks[key](msg), shm_threshold)
+
+
+class ExecutorManager:
+    """
+    Runs listener callbacks out of the event loop: executor="thread" callbacks are called in a bounded
+    thread pool, so a blocking sync callback doesn't stall other subscriptions, tasks and the HTTP server.
+    executor="process" callbacks are called in a process pool of the listener, for CPU-bound handlers
+    """
+
+    def __init__(
+            self,
+            thread_pool_size: int = None,
+            thread_pool_max_queue: int = None,
+            process_shm_threshold: int = 1024 * 1024,
+    ):
+        """
+        :param thread_pool_size: number of threads, min(32, cpu_count + 4) by default
+        :param thread_pool_max_queue: max number of callbacks waiting for a free thread, None - unlimited.
+                                      When the queue is full, next messages wait in the NATS pending queue
+        :param process_shm_threshold: pickled messages and responses of executor="process" callbacks
+                                      starting from this size in bytes are passed through shared memory
+        """
+        self.thread_pool_size = thread_pool_size or min(32, (os.cpu_count() or 1) + 4)
+        self.thread_pool_max_queue = thread_pool_max_queue
+        self.process_shm_threshold = process_shm_threshold
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._thread_slots: Optional[asyncio.Semaphore] = None
+        self._thread_in_flight = 0
+        self._process_pools: List["_ProcessPool"] = []
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_pool_size, thread_name_prefix="panini_listener"
+            )
+        return self._thread_pool
+
+    @property
+    def thread_queue_depth(self) -> int:
+        if self._thread_pool is None:
+            return 0
+        return self._thread_pool._work_queue.qsize()
+
+    def wrap_callback(self, callback: Callable, executor: str = "loop", pool_size: int = None) -> Callable:
+        """
+        Returns the callback that runs in the given executor, middlewares wrap it as a usual async callback
+        :param pool_size: number of processes for executor="process", cpu_count by default
+        """
+        assert executor in EXECUTORS, f"executor must be one of {EXECUTORS}"
+        if executor == "loop":
+            return callback
+
+        assert not asyncio.iscoroutinefunction(callback), \
+            f"executor='{executor}' is supported for sync callbacks only"
+
+        if executor == "process":
+            pool = _ProcessPool(callback, pool_size or os.cpu_count() or 1, self.process_shm_threshold)
+            self._process_pools.append(pool)
+
+            @functools.wraps(callback)
+            async def process_callback(msg):
+                return await pool.run(msg)
+
+            return process_callback
+
+        @functools.wraps(callback)
+        async def thread_callback(msg):
+            return await self.run_in_thread(callback, msg)
+
+        return thread_callback
+
+    async def run_in_thread(self, func: Callable, *args):
+        if self.thread_pool_max_queue is not None and self._thread_slots is None:
+            self._thread_slots = asyncio.Semaphore(self.thread_pool_size + self.thread_pool_max_queue)
+        if self._thread_slots is not None:
+            await self._thread_slots.acquire()
+        self._thread_in_flight += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self.thread_pool, func, *args)
+        finally:
+            self._thread_in_flight -= 1
+            if self._thread_slots is not None:
+                self._thread_slots.release()
+
+    def stats(self) -> dict:
+        queue_depth = self.thread_queue_depth
+        return {
+            "thread": {
+                "size": self.thread_pool_size,
+                "active": self._thread_in_flight - queue_depth,
+                "queue_depth": queue_depth,
+                "max_queue": self.thread_pool_max_queue,
+            },
+            "process": {
+                "size": sum(pool.size for pool in self._process_pools),
+                "active": sum(min(pool.in_flight, pool.size) for pool in self._process_pools),
+                "queue_depth": sum(max(pool.in_flight - pool.size, 0) for pool in self._process_pools),
+            },
+        }
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = None
+        for pool in self._process_pools:
+            pool.shutdown()
+
+
+class _ProcessPool:
+    """
+    Process pool of a single executor="process" listener
+    """
+
+    def __init__(self, callback: Callable, size: int, shm_threshold: int):
+        self.size = size
+        self.shm_threshold = shm_threshold
+        self.in_flight = 0
+        self._key = next(_process_callback_keys)
+        _process_callbacks[self._key] = callback
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Set[concurrent.futures.Future] = set()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_process_initializer,
+                initargs=(os.getpid(),),
+            )
+        return self._executor
+
+    async def run(self, msg):
+        payload = _dumps(_detach(msg), self.shm_threshold)
+        self.in_flight += 1
+        future = self.executor.submit(_run_process_callback, self._key, payload, self.shm_threshold)
+        future.add_done_callback(functools.partial(_discard_request, payload))
+        self._pending.add(future)
+        try:
+            response = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # the response of a call that is already running is never loaded
+            future.add_done_callback(_discard_response)
+            raise
+        finally:
+            self._pending.discard(future)
+            self.in_flight -= 1
+        return _loads(response)
+
+    def shutdown(self):
+        if self._executor is not None:
+            # shutdown(cancel_futures=True) needs python 3.9, cancel() is a no-op for running calls
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=False)
+            self._executor = None
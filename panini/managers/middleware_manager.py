@@ -1,5 +1,5 @@
 import asyncio
-from typing import Callable, Type
+from typing import Callable, Tuple, Type
 
 from panini.middleware import Middleware
 
@@ -40,39 +40,101 @@ class MiddlewareManager:
 
         # check, that at least one function is implemented
         assert any(
-            function in middleware_cls.__dict__
+            self._is_implemented(middleware_cls, function)
             for function in high_priority_functions + global_functions
         ), f"At least one of the following functions must be implemented: {high_priority_functions + global_functions}"
 
         middleware_obj = middleware_cls(*args, **kwargs)
         for function_name in high_priority_functions:
-            if function_name in middleware_cls.__dict__:
+            if self._is_implemented(middleware_cls, function_name):
                 self._middlewares[f"{function_name}_middleware"].append(
                     getattr(middleware_obj, function_name)
                 )
 
-        if "send_any" in middleware_cls.__dict__:
-            if "send_publish" not in middleware_cls.__dict__:
+        if self._is_implemented(middleware_cls, "send_any"):
+            if not self._is_implemented(middleware_cls, "send_publish"):
                 self._middlewares["send_publish_middleware"].append(
                     middleware_obj.send_any
                 )
 
-            if "send_request" not in middleware_cls.__dict__:
+            if not self._is_implemented(middleware_cls, "send_request"):
                 self._middlewares["send_request_middleware"].append(
                     middleware_obj.send_any
                 )
 
-        if "listen_any" in middleware_cls.__dict__:
-            if "listen_publish" not in middleware_cls.__dict__:
+        if self._is_implemented(middleware_cls, "listen_any"):
+            if not self._is_implemented(middleware_cls, "listen_publish"):
                 self._middlewares["listen_publish_middleware"].append(
                     middleware_obj.listen_any
                 )
 
-            if "listen_request" not in middleware_cls.__dict__:
+            if not self._is_implemented(middleware_cls, "listen_request"):
                 self._middlewares["listen_request_middleware"].append(
                     middleware_obj.listen_any
                 )
 
+    @staticmethod
+    def _is_implemented(middleware_cls: Type[Middleware], function_name: str) -> bool:
+        # hooks inherited from the base Middleware are no-ops, they never get into a chain
+        return getattr(middleware_cls, function_name, None) is not getattr(Middleware, function_name)
+
+    def compile_chain(self, function: Callable, middleware_key: str) -> Callable:
+        """
+        Builds the middleware chain for the function once, so a call costs one frame per middleware.
+        Middlewares are called directly, awaitables they return are passed up the chain as is
+        function: Callable - function to wrap
+        middleware_key: str - key of the middlewares dict, e.g. `listen_request_middleware`
+        """
+        middlewares = self._middlewares[middleware_key]
+        if not middlewares:
+            return function
+
+        chain = function
+        for middleware in middlewares[:-1]:
+            chain = self._link(middleware, chain, middleware_key.startswith("listen"))
+
+        # outermost link keeps the coroutine function type of the middleware,
+        # so callers resolve sync/async dispatch once instead of on every message
+        outermost = middlewares[-1]
+        if middleware_key.startswith("listen"):
+            if asyncio.iscoroutinefunction(outermost):
+                async def async_listen_entry(msg):
+                    return await outermost(msg, chain)
+                return async_listen_entry
+
+            def listen_entry(msg):
+                return outermost(msg, chain)
+            return listen_entry
+
+        if asyncio.iscoroutinefunction(outermost):
+            async def async_send_entry(subject: str, message, *args, **kwargs):
+                return await outermost(subject, message, chain, *args, **kwargs)
+            return async_send_entry
+
+        def send_entry(subject: str, message, *args, **kwargs):
+            return outermost(subject, message, chain, *args, **kwargs)
+        return send_entry
+
+    @staticmethod
+    def _link(middleware: Callable, func: Callable, listen: bool) -> Callable:
+        if listen:
+            def listen_link(msg):
+                return middleware(msg, func)
+            return listen_link
+
+        def send_link(subject: str, message, *args, **kwargs):
+            return middleware(subject, message, func, *args, **kwargs)
+        return send_link
+
+    def compile_listen_chains(self, function: Callable) -> Tuple[Callable, Callable]:
+        """
+        Returns chains for received publish and request messages of the listener
+        """
+        return (
+            self.compile_chain(function, "listen_publish_middleware"),
+            self.compile_chain(function, "listen_request_middleware"),
+        )
+
     def wrap_function_by_middleware(self, function_type: str) -> Callable:
         """
         function: Callable - function to wrap
@@ -85,91 +147,31 @@ class MiddlewareManager:
         ), "function type must be in (`listen`, `publish`, `request`)"
 
         def decorator(function: Callable):
-            def wrap_function_by_send_middleware(
-                    func: Callable, single_middleware
-            ) -> Callable:
-                def next_wrapper(subject: str, message, *args, **kwargs):
-                    return single_middleware(subject, message, func, *args, **kwargs)
-
-                async def async_next_wrapper(subject: str, message, *args, **kwargs):
-                    return await single_middleware(
-                        subject, message, func, *args, **kwargs
-                    )
-
-                if asyncio.iscoroutinefunction(single_middleware):
-                    return async_next_wrapper
-                else:
-                    return next_wrapper
-
-            def wrap_function_by_listen_middleware(
-                    func: Callable, single_middleware
-            ) -> Callable:
-                def next_wrapper(msg):
-                    return single_middleware(msg, func)
-
-                async def async_next_wrapper(msg):
-                    return await single_middleware(msg, func)
-
-                if asyncio.iscoroutinefunction(single_middleware):
-                    return async_next_wrapper
-                else:
-                    return next_wrapper
-
-            def build_middleware_wrapper(
-                    func: Callable, middleware_key: str, wrapper: Callable
-            ) -> Callable:
-                for middleware in self._middlewares[middleware_key]:
-                    func = wrapper(func, middleware)
-                return func
-
             if function_type == "publish":
-                return build_middleware_wrapper(
-                    function,
-                    "send_publish_middleware",
-                    wrap_function_by_send_middleware,
-                )
+                return self.compile_chain(function, "send_publish_middleware")
 
             elif function_type == "request":
-                return build_middleware_wrapper(
-                    function,
-                    "send_request_middleware",
-                    wrap_function_by_send_middleware,
-                )
-
-            else:
-                if (
-                        len(self._middlewares["listen_publish_middleware"]) == 0
-                        and len(self._middlewares["listen_request_middleware"])
-                        == 0
-                ):
-                    return function
-
-                function_listen_publish = build_middleware_wrapper(
-                    function,
-                    "listen_publish_middleware",
-                    wrap_function_by_listen_middleware,
-                )
-                function_listen_request = build_middleware_wrapper(
-                    function,
-                    "listen_request_middleware",
-                    wrap_function_by_listen_middleware,
-                )
+                return self.compile_chain(function, "send_request_middleware")
 
-                def listen_wrapper(msg) -> Callable:
-                    if msg.reply == "":
-                        return function_listen_publish(msg)
-                    else:
-                        return function_listen_request(msg)
+            function_listen_publish, function_listen_request = self.compile_listen_chains(function)
+            if function_listen_publish is function and function_listen_request is function:
+                return function
 
-                async def async_listen_wrapper(msg) -> Callable:
-                    if msg.reply == "":
-                        return await function_listen_publish(msg)
-                    else:
-                        return await function_listen_request(msg)
+            def listen_wrapper(msg) -> Callable:
+                if msg.reply == "":
+                    return function_listen_publish(msg)
+                else:
+                    return function_listen_request(msg)
 
-                if asyncio.iscoroutinefunction(function):
-                    return async_listen_wrapper
+            async def async_listen_wrapper(msg) -> Callable:
+                if msg.reply == "":
+                    return await function_listen_publish(msg)
                 else:
-                    return listen_wrapper
+                    return await function_listen_request(msg)
+
+            if asyncio.iscoroutinefunction(function):
+                return async_listen_wrapper
+            else:
+                return listen_wrapper
 
         return decorator
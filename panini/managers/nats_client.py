@@ -1,16 +1,37 @@
 import asyncio
-import threading
+import dataclasses
+import time
 import nest_asyncio
-from typing import Union, List, Dict
+from dataclasses import dataclass
+from typing import Union, List, Dict, Iterable, AsyncIterable, AsyncIterator, Any, Optional
 from nats.aio.client import Client as NATS
-from panini.exceptions import JetStreamNotEnabledError, UnsubscribeError, InitializingNATSError, MessageSchemaError
+from nats.aio.msg import Msg
+from panini.exceptions import (
+    JetStreamNotEnabledError,
+    UnsubscribeError,
+    InitializingNATSError,
+    MessageSchemaError,
+    NATSTimeoutError,
+)
+from panini.managers.circuit_breaker import CircuitBreakers
+from panini.managers.connection_monitor import ConnectionMonitor
+from panini.managers.connection_pool import ConnectionPool
 from panini.managers.event_manager import JsListen, Listen
+from panini.managers.executor_manager import ExecutorManager
 from panini.managers.middleware_manager import MiddlewareManager
+from panini.managers.priority_scheduler import PriorityScheduler
+from panini.managers.publish_pipeline import PublishPipeline
+from panini.managers.rate_limiter import RateLimiter
+from panini.managers.request_cache import RequestCache
+from panini.managers.request_hedger import RequestHedger
 from panini.managers.schema_manager import SchemaManager
+from panini.managers.sync_bridge import SyncBridge
+from panini.utils import deadline as deadline_context
 from panini.utils.logger import get_logger
+from panini.utils.reply_cache import ReplyCache
+from panini.utils.subject_index import SubjectIndex, pattern_covers, is_wildcard_pattern
 
 NoneType = type(None)
-nest_asyncio.apply()
 
 
 class NATSClient:
@@ -28,6 +49,28 @@ class NATSClient:
             queue="",
             pending_bytes_limit=65536 * 1024 * 10,
             enable_js: bool = False,
+            max_in_flight: int = None,
+            publish_pipeline: bool = False,
+            publish_buffer_size: int = 65536,
+            publish_flush_interval: float = 0.0,
+            dispatch_subjects: List[str] = None,
+            thread_pool_size: int = None,
+            thread_pool_max_queue: int = None,
+            process_shm_threshold: int = 1024 * 1024,
+            drain_timeout: float = 10,
+            connection_lost_policy="reconnect",
+            rtt_interval: float = 10.0,
+            request_cache_rules: Dict[str, dict] = None,
+            request_cache_size: int = 1024,
+            hedge_rules: Dict[str, Union[float, str]] = None,
+            hedge_budget: float = 0.1,
+            hedge_percentile: float = 0.95,
+            connections: int = 1,
+            connection_lanes: Dict[str, int] = None,
+            priority_concurrency: int = None,
+            priority_max_wait: float = 1.0,
+            breaker_rules: Dict[str, dict] = None,
+            propagate_deadline: bool = True,
             **kwargs
     ):
         """
@@ -36,6 +79,40 @@ class NATSClient:
         :param allow_reconnect: False if you want to stop instance when connection lost
         :param max_reconnect_attempts:
         :param reconnecting_time_wait:
+        :param max_in_flight: default limit of concurrently handled messages per listener, None - unlimited
+        :param publish_pipeline: buffer outgoing messages and write them in bursts, see PublishPipeline
+        :param publish_buffer_size: buffered bytes that trigger a write in publish_pipeline mode
+        :param publish_flush_interval: max seconds a message waits in the buffer in publish_pipeline mode
+        :param dispatch_subjects: wildcard subjects, e.g. ["orders.>"]. Listeners covered by one of them share
+                                  a single NATS subscription and are routed locally by a subject trie
+        :param thread_pool_size: number of threads for executor="thread" listeners
+        :param thread_pool_max_queue: max number of executor="thread" callbacks waiting for a free thread
+        :param process_shm_threshold: executor="process" messages and responses starting from this size in bytes
+                                      are passed to pool processes through shared memory
+        :param drain_timeout: max time in seconds disconnect waits for in-flight handlers
+        :param connection_lost_policy: "reconnect", "exit" or callable(connection_stats) -> bool,
+                                       see ConnectionMonitor
+        :param rtt_interval: seconds between RTT measurements, None or 0 - disabled
+        :param request_cache_rules: request coalescing and response caching by subject pattern,
+                                    e.g. {"config.>": {"coalesce": True, "cache_ttl": 5}}, see RequestCache
+        :param request_cache_size: max number of responses in the request cache
+        :param hedge_rules: hedged requests by subject pattern, delay in seconds or "auto" - observed
+                            hedge_percentile latency of the subject, e.g. {"prices.*": "auto"}, see RequestHedger
+        :param hedge_budget: hedge tokens added by every request of a hedged subject, a hedge takes one token,
+                             the balance is capped at 10
+        :param hedge_percentile: latency percentile used as the hedge delay for "auto"
+        :param connections: number of NATS connections, subscriptions are spread over them by subject hash
+                            or connection_lanes, see ConnectionPool
+        :param connection_lanes: connection index by subject pattern for subscriptions, publishes and requests,
+                                 e.g. {"ingest.>": 1}. Publishes and requests of other subjects use connection 0
+        :param priority_concurrency: max number of handlers of all listeners running at the same time, waiting ones
+                                     are dispatched by listener priority, see PriorityScheduler. None - disabled
+        :param priority_max_wait: seconds after which a waiting handler is dispatched first whatever its priority
+        :param breaker_rules: circuit breakers of requests by subject pattern, e.g. {"payments.>": {"failure_rate": 0.5,
+                              "open_timeout": 5}}, see CircuitBreakers
+        :param propagate_deadline: requests carry the panini-timeout header, expired requests are dropped before
+                                   the listener runs, requests sent by a listener get no more time than
+                                   is left until the deadline of the request being handled
         """
         if auth is None:
             auth = {}
@@ -54,23 +131,53 @@ class NATSClient:
         self.reconnecting_time_wait = reconnecting_time_wait
         self.pending_bytes_limit = pending_bytes_limit
         self.enable_js = enable_js
+        self.max_in_flight = max_in_flight
+        self.use_publish_pipeline = publish_pipeline
+        self.publish_buffer_size = publish_buffer_size
+        self.publish_flush_interval = publish_flush_interval
+        self.publish_pipeline = None
+        self.dispatch_subjects = dispatch_subjects or []
         self.sub_map = {}
         self.js_stream_map = {}
+        self.handler_map = {}
+        self.dispatchers = {}
+        self.drain_timeout = drain_timeout
+        # tasks of messages being handled, awaited on disconnect
+        self.handler_tasks = set()
+        self.reply_caches: Dict[str, List[ReplyCache]] = {}
+        self.request_cache = RequestCache(request_cache_rules, max_size=request_cache_size)
+        self.request_hedger = RequestHedger(hedge_rules, budget=hedge_budget, percentile=hedge_percentile)
+        self.connection_monitor = ConnectionMonitor(connection_lost_policy, rtt_interval)
+        self.connections = ConnectionPool(connections, connection_lanes)
+        self.rate_limiter = RateLimiter()
+        self.circuit_breakers = CircuitBreakers(breaker_rules)
+        self.propagate_deadline = propagate_deadline
+        self.priority_scheduler = None
+        if priority_concurrency:
+            self.priority_scheduler = PriorityScheduler(priority_concurrency, max_wait=priority_max_wait)
 
         self.include_subjects = None
         self.exclude_subjects = None
 
         self._middleware_manager = MiddlewareManager()
+        self.executor_manager = ExecutorManager(
+            thread_pool_size=thread_pool_size,
+            thread_pool_max_queue=thread_pool_max_queue,
+            process_shm_threshold=process_shm_threshold,
+        )
 
         def not_assigned_method(*args, **kwargs):
             raise InitializingNATSError("used before assignment")
 
         self._publish_wrapped = not_assigned_method
+        self._publish_many_wrapped = not_assigned_method
         self._request_wrapped = not_assigned_method
 
         self._connection_kwargs = kwargs
 
         self.loop = loop
+        self.nested_loop = False
+        self.sync_bridge = SyncBridge(self)
 
     @property
     def js(self):
@@ -85,10 +192,24 @@ class NATSClient:
 
 
     def start(self):
+        self._wrap_send_functions()
+        self.loop.run_until_complete(self._establish_connection())
+
+    async def connect(self):
+        """
+        Connects from the running loop, used by App.run()
+        """
+        self._wrap_send_functions()
+        await self._establish_connection()
+
+    def _wrap_send_functions(self):
         # inject send_middlewares
         self._publish_wrapped = self._middleware_manager.wrap_function_by_middleware(
             "publish"
         )(self._publish)
+        self._publish_many_wrapped = self._middleware_manager.wrap_function_by_middleware(
+            "publish"
+        )(self._publish_many)
         self._publish_js_wrapped = self._middleware_manager.wrap_function_by_middleware(
             "publish"
         )(self._publish_js)
@@ -96,7 +217,39 @@ class NATSClient:
             "request"
         )(self._request)
 
-        self.loop.run_until_complete(self._establish_connection())
+    def enable_nested_loop(self):
+        """
+        Allows *_sync functions to be called from the loop thread (nested run_until_complete),
+        used by the legacy App.start() only, because nest_asyncio patches asyncio globally
+        """
+        try:
+            nest_asyncio.apply(self.loop)
+        except ValueError:
+            self.logger.warning(
+                f"Nested loops are not supported by {type(self.loop).__name__}, "
+                f"*_sync functions can be called from other threads only"
+            )
+            return
+        self.nested_loop = True
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _run_sync(self, coro):
+        if not self.loop.is_running():
+            return self.loop.run_until_complete(coro)
+        if not self._in_loop_thread():
+            return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        if self.nested_loop:
+            return self.loop.run_until_complete(coro)
+        coro.close()
+        raise RuntimeError(
+            "Sync functions can't block the running event loop, "
+            "await the async version or call it from another thread"
+        )
 
     @property
     def middleware_manager(self):
@@ -110,14 +263,7 @@ class NATSClient:
     def middlewares(self, value: dict):
         self._middleware_manager.middlewares = value
 
-    async def _panini_watcher(self):
-        while True:
-            await asyncio.sleep(1)
-            if not self.client.is_connected and self.client.is_closed:
-                exit(99)
-
     async def _establish_connection(self):
-        self.client = NATS()
         if self.servers is None:
             server = 'nats://' + self.host + ":" + str(self.port)
             self.servers = [server]
@@ -125,7 +271,8 @@ class NATSClient:
         kwargs = {
             "servers": self.servers,
             "name": self.client_nats_name,
-            **self._connection_kwargs
+            **self._connection_kwargs,
+            **self.connection_monitor.connect_kwargs(self._connection_kwargs),
         }
         if self.allow_reconnect:
             kwargs["allow_reconnect"] = self.allow_reconnect
@@ -134,8 +281,16 @@ class NATSClient:
         if self.reconnecting_time_wait:
             kwargs["reconnect_time_wait"] = self.reconnecting_time_wait
         kwargs.update(self.auth)
-        await self.client.connect(**kwargs)
-        self.loop.create_task(self._panini_watcher())
+        await self.connections.connect(**kwargs)
+        # the primary connection, used by JetStream and the publish pipeline
+        self.client = self.connections.primary
+        if self.use_publish_pipeline:
+            self.publish_pipeline = PublishPipeline(
+                self.client,
+                buffer_size=self.publish_buffer_size,
+                flush_interval=self.publish_flush_interval,
+            )
+        self.connection_monitor.start(self.client)
         if self.enable_js:
             self._js = self.client.jetstream()
 
@@ -166,22 +321,24 @@ class NATSClient:
         print("======================================================================================\n")
 
     def subscribe_new_subject_sync(self, listener: Listen):
-        self.loop.run_until_complete(self.subscribe_new_subject(listener))
+        self._run_sync(self.subscribe_new_subject(listener))
 
     async def subscribe_new_subject(self, listener: Listen):
         params = listener.__dict__
         subject = params.get("subject")
-        callback = params.get("callback")
-        data_type = params.get("data_type")
         queue = params.get("queue")
         if not queue:
             queue = self.queue
 
-        callback_with_middleware = self._middleware_manager.wrap_function_by_middleware("listen")(callback)
-        wrapped_callback = _ReceivedMessageHandler(self._publish, callback_with_middleware, data_type).call
-        sub = await self.client.subscribe(
+        handler = self._create_message_handler(listener)
+        dispatch_subject = self._find_dispatch_subject(subject, queue)
+        if dispatch_subject is not None:
+            return await self._subscribe_dispatched(dispatch_subject, subject, handler)
+
+        client = self.connections.for_subscription(subject, listener._meta.get("connection"))
+        sub = await client.subscribe(
             subject,
-            cb=wrapped_callback,
+            cb=handler.call,
             pending_bytes_limit=self.pending_bytes_limit,
             queue=queue,
         )
@@ -189,44 +346,165 @@ class NATSClient:
         if subject not in self.sub_map:
             self.sub_map[subject] = []
         self.sub_map[subject].append(sub)
+        self.handler_map[sub] = handler
         return sub
 
+    def _find_dispatch_subject(self, subject: str, queue: str):
+        if queue != self.queue:
+            return None
+        for dispatch_subject in self.dispatch_subjects:
+            if pattern_covers(dispatch_subject, subject):
+                return dispatch_subject
+
+    async def _subscribe_dispatched(self, dispatch_subject: str, subject: str, handler):
+        dispatcher = self.dispatchers.get(dispatch_subject)
+        if dispatcher is None:
+            dispatcher = _SubjectDispatcher()
+            sub = await self.connections.for_subscription(dispatch_subject).subscribe(
+                dispatch_subject,
+                cb=dispatcher.call,
+                pending_bytes_limit=self.pending_bytes_limit,
+                queue=self.queue,
+            )
+            dispatcher.sub = sub
+            self.dispatchers[dispatch_subject] = dispatcher
+            self.sub_map[dispatch_subject] = [sub]
+            self.handler_map[sub] = dispatcher
+        dispatcher.add(subject, handler)
+        return dispatcher.sub
+
     async def subscribe_new_js(self, js_listener: JsListen):
-        params = js_listener.__dict__
-        callback = params.get("callback")
-        data_type = params.get("data_type")
-        queue = params.get("queue")
+        params = {
+            key: value
+            for key, value in js_listener.__dict__.items()
+            if key not in ("callback", "data_type", "queue", "_meta")
+        }
+        queue = js_listener.queue
         if not queue:
             queue = self.queue
-        callback_with_middleware = self._middleware_manager.wrap_function_by_middleware("listen")(callback)
-        wrapped_callback = _ReceivedMessageHandler(self._publish, callback_with_middleware, data_type).call_js
+        handler = self._create_message_handler(js_listener)
 
         sub = await self.js.subscribe(
             queue=queue,
-            cb=wrapped_callback,
+            cb=handler.call_js,
+            pending_bytes_limit=self.pending_bytes_limit,
             **params
         )
         stream = sub._stream
         if stream not in self.js_stream_map:
             self.js_stream_map[stream] = []
         self.js_stream_map[stream].append(sub)
+        self.handler_map[sub] = handler
         return sub
 
+    def _create_message_handler(self, listener: Listen):
+        callback = self.executor_manager.wrap_callback(
+            listener.callback,
+            listener._meta.get("executor", "loop"),
+            pool_size=listener._meta.get("pool_size"),
+        )
+        publish_cb, request_cb = self._middleware_manager.compile_listen_chains(callback)
+        max_in_flight = listener._meta.get("max_in_flight", self.max_in_flight)
+        batch_size = listener._meta.get("batch_size")
+        priority = listener._meta.get("priority")
+        lane = None
+        if self.priority_scheduler is not None:
+            lane = self.priority_scheduler.lane(priority or "normal")
+        else:
+            assert priority is None, "priority requires priority_concurrency App argument"
+        cache = None
+        if listener._meta.get("cache_ttl"):
+            assert not batch_size, "cache_ttl is not supported for batch listeners"
+            cache = ReplyCache(
+                listener._meta["cache_ttl"],
+                listener._meta.get("cache_size", 1024),
+                listener._meta.get("cache_key_headers"),
+            )
+            self.reply_caches.setdefault(listener.subject, []).append(cache)
+        if batch_size:
+            return _BatchMessageHandler(
+                self._publish,
+                publish_cb,
+                listener.data_type,
+                subject=listener.subject,
+                batch_size=batch_size,
+                batch_timeout=listener._meta.get("batch_timeout", 100),
+                max_in_flight=max_in_flight,
+                tasks=self.handler_tasks,
+                scheduler=self.priority_scheduler,
+                lane=lane,
+            )
+        return _ReceivedMessageHandler(
+            self._publish,
+            publish_cb,
+            listener.data_type,
+            max_in_flight=max_in_flight,
+            request_cb=request_cb,
+            tasks=self.handler_tasks,
+            cache=cache,
+            scheduler=self.priority_scheduler,
+            lane=lane,
+        )
+
+    def subscription_stats(self) -> Dict[str, List[dict]]:
+        """
+        Returns in-flight handlers count and the NATS pending queue depth for every subscription
+        """
+        subscriptions = {**self.sub_map, **self.js_stream_map}
+        stats = {}
+        for subject, subs in subscriptions.items():
+            stats[subject] = []
+            for sub in subs:
+                handler = self.handler_map.get(sub)
+                stats[subject].append({
+                    "in_flight": handler.in_flight if handler else 0,
+                    "max_in_flight": handler.max_in_flight if handler else None,
+                    "expired": handler.expired if handler else 0,
+                    "pending_msgs": sub.pending_msgs,
+                    "pending_bytes": sub.pending_bytes,
+                })
+        return stats
+
+    def cache_stats(self) -> Dict[str, List[dict]]:
+        """
+        Returns hits, misses and size of reply caches of listeners with cache_ttl
+        """
+        return {subject: [cache.stats() for cache in caches] for subject, caches in self.reply_caches.items()}
+
+    def invalidate_cache(self, subject: str = None, message=None) -> int:
+        """
+        Removes cached responses for subjects matched by the subject (a pattern with wildcards is allowed),
+        all of them if None. With message, only the response to this message is removed, it must be encoded
+        the same way the requester does, e.g. bytes. Returns the number of removed responses
+        """
+        data = None if message is None else self.format_message_data_type(message, type(message))
+        return sum(
+            cache.invalidate(subject, data)
+            for caches in self.reply_caches.values()
+            for cache in caches
+        )
+
     def unsubscribe_subject_sync(self, subject: str):
-        self.loop.run_until_complete(self.unsubscribe_subject(subject))
+        self._run_sync(self.unsubscribe_subject(subject))
 
     async def unsubscribe_subject(self, subject: str):
+        for dispatcher in self.dispatchers.values():
+            if dispatcher.remove(subject):
+                return
         if subject not in self.sub_map:
             raise UnsubscribeError(f"Subject {subject} hasn't been subscribed")
         for sub in self.sub_map[subject]:
             await sub.unsubscribe()
+            self.handler_map.pop(sub, None)
         del self.sub_map[subject]
+        self.dispatchers.pop(subject, None)
 
     async def unsubscribe_js_listen(self, stream: str):
         if stream not in self.js_stream_map:
             raise UnsubscribeError(f"Stream {stream} hasn't been subscribed")
         for js_listener in self.js_stream_map[stream]:
             await js_listener.unsubscribe()
+            self.handler_map.pop(js_listener, None)
         del self.js_stream_map[stream]
         del self.js_listeners[stream]
 
@@ -240,13 +518,14 @@ class NATSClient:
             *args,
             **kwargs
     ):
-        asyncio.ensure_future(
-            self.publish(subject, message, reply_to, force, headers, *args,
-            **kwargs)
-        )
+        coro = self.publish(subject, message, reply_to, force, headers, *args, **kwargs)
+        if self._in_loop_thread() or not self.loop.is_running():
+            asyncio.ensure_future(coro, loop=self.loop)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
 
     def publish_from_another_thread(self, subject: str, message):
-        self.loop.call_soon_threadsafe(self.publish_sync, subject, message)
+        self.sync_bridge.publish_single(subject, message)
 
     def request_sync(
             self,
@@ -258,7 +537,7 @@ class NATSClient:
             *args,
             **kwargs
     ):
-        return self.loop.run_until_complete(
+        return self._run_sync(
             self.request(subject, message, timeout, response_data_type, headers, *args,
             **kwargs)
         )
@@ -270,13 +549,7 @@ class NATSClient:
             timeout: int = 10,
             headers: dict = None,
     ):
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-        return loop.run_until_complete(
-            self.request_from_another_thread(subject, message, timeout, headers)
-        )
+        return self.sync_bridge.request(subject, message, timeout, headers=headers)
 
     async def request_from_another_thread(
             self,
@@ -285,17 +558,10 @@ class NATSClient:
             timeout: int = 10,
             headers: dict = None,
     ):
-        fut = asyncio.run_coroutine_threadsafe(
-            self.request(subject, message, timeout, headers=headers), self.loop
+        # awaited in the event loop of the calling thread without blocking an executor thread
+        return await asyncio.wrap_future(
+            self.sync_bridge.request_future(subject, message, timeout, headers=headers)
         )
-        finished = threading.Event()
-
-        def fut_finished_cb(_):
-            finished.set()
-
-        fut.add_done_callback(fut_finished_cb)
-        await asyncio.get_event_loop().run_in_executor(None, finished.wait)
-        return fut.result()
 
     @staticmethod
     def format_message_data_type(message, data_type):
@@ -313,9 +579,15 @@ class NATSClient:
             headers: dict = None,
     ):
         message = self.format_message_data_type(message, type(message))
-        await self.client.publish(subject=subject, payload=message, reply=reply_to, headers=headers)
+        client = self.connections.for_publish(subject)
+        if self.publish_pipeline is not None and client is self.client:
+            await self.publish_pipeline.publish(subject, message, reply_to, headers, force)
+            return
+        await client.publish(subject=subject, payload=message, reply=reply_to, headers=headers)
+        if self.connection_monitor.outage_started is not None:
+            self.connection_monitor.sample_buffer()
         if force:
-            await self.client.flush()
+            await client.flush()
         await asyncio.sleep(0)
 
     async def publish(
@@ -328,6 +600,8 @@ class NATSClient:
             *args,
             **kwargs
     ):
+        if self.rate_limiter and not await self.rate_limiter.acquire(subject):
+            return
         return await self._publish_wrapped(
             subject=subject,
             message=message,
@@ -338,6 +612,93 @@ class NATSClient:
             **kwargs
         )
 
+    async def _publish_many(
+            self,
+            subject: str,
+            message: list,
+            headers: dict = None,
+    ):
+        """
+        :param subject: common subject of the batch, used by middlewares only
+        :param message: list of (subject, message[, headers]) tuples
+        :param headers: headers added to every message of the batch (e.g. by middlewares)
+        """
+        batch = [
+            (
+                item[0],
+                self.format_message_data_type(item[1], type(item[1])),
+                self._merge_headers(headers, item[2] if len(item) > 2 else None),
+            )
+            for item in message
+        ]
+        if self.publish_pipeline is not None:
+            await self.publish_pipeline.write()
+        clients = set()
+        for item_subject, payload, item_headers in batch:
+            client = self.connections.for_publish(item_subject)
+            await client.publish(subject=item_subject, payload=payload, headers=item_headers)
+            clients.add(client)
+        for client in clients:
+            await client.flush()
+
+    @staticmethod
+    def _merge_headers(batch_headers: dict, headers: dict):
+        if not batch_headers:
+            return headers
+        if not headers:
+            return batch_headers
+        return {**batch_headers, **headers}
+
+    async def publish_many(
+            self,
+            items: Union[Iterable[tuple], AsyncIterable[tuple]],
+            batch_size: int = None,
+            headers: dict = None,
+            *args,
+            **kwargs
+    ):
+        """
+        Publishes many messages with a single middlewares call and a single flush per batch.
+        Returns when the whole batch has reached the NATS broker
+        :param items: (subject, message[, headers]) tuples or an async iterator of them
+        :param batch_size: max messages per batch, 1000 by default for async iterators,
+                           one batch for other iterables
+        """
+        assert batch_size is None or batch_size > 0, "batch_size must be a positive number"
+        if hasattr(items, "__aiter__"):
+            batch_size = batch_size or 1000
+            batch = []
+            async for item in items:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    await self._publish_batch(batch, headers, *args, **kwargs)
+                    batch = []
+            if batch:
+                await self._publish_batch(batch, headers, *args, **kwargs)
+            return
+
+        items = list(items)
+        if not items:
+            return
+        batch_size = batch_size or len(items)
+        for i in range(0, len(items), batch_size):
+            await self._publish_batch(items[i:i + batch_size], headers, *args, **kwargs)
+
+    async def _publish_batch(self, batch: list, headers: dict = None, *args, **kwargs):
+        if self.rate_limiter:
+            batch = [item for item in batch if await self.rate_limiter.acquire(item[0])]
+            if not batch:
+                return
+        subjects = {item[0] for item in batch}
+        subject = subjects.pop() if len(subjects) == 1 else ">"
+        return await self._publish_many_wrapped(
+            subject=subject,
+            message=batch,
+            headers=headers,
+            *args,
+            **kwargs
+        )
+
     async def _request(
             self,
             subject: str,
@@ -345,10 +706,53 @@ class NATSClient:
             timeout: int = 10,
             response_data_type: type = dict,
             headers: dict = None,
+            coalesce: bool = None,
+            cache_ttl: float = None,
+            hedge_delay: Union[float, str] = None,
     ):
         message = self.format_message_data_type(message, type(message))
-        response = await self.client.request(subject, message, timeout=timeout, headers=headers)
-        return SchemaManager.serialize_message(response_data_type, response.data)
+        if self.propagate_deadline:
+            timeout, headers = self._apply_deadline(timeout, headers)
+        coalesce, cache_ttl = self.request_cache.options(subject, coalesce, cache_ttl)
+        hedge = self.request_hedger.policy(subject, hedge_delay)
+        client = self.connections.for_publish(subject)
+        breaker = self.circuit_breakers.match(subject) if self.circuit_breakers else None
+        if not coalesce and not cache_ttl and hedge is None:
+            request = client.request(subject, message, timeout=timeout, headers=headers)
+            response = await (request if breaker is None else breaker.call(subject, request))
+            return SchemaManager.serialize_message(response_data_type, response.data)
+
+        async def send_once(send_timeout: float) -> bytes:
+            return (await client.request(subject, message, timeout=send_timeout, headers=headers)).data
+
+        async def send(send_timeout: float) -> bytes:
+            if hedge is None:
+                round_trip = send_once(send_timeout)
+            else:
+                round_trip = self.request_hedger.request(subject, send_once, hedge, send_timeout)
+            if breaker is not None:
+                return await breaker.call(subject, round_trip)
+            return await round_trip
+
+        if not coalesce and not cache_ttl:
+            return SchemaManager.serialize_message(response_data_type, await send(timeout))
+
+        # raw bytes are shared, so every caller gets its own decoded response
+        data = await self.request_cache.request(subject, message, send, coalesce, cache_ttl, timeout, headers)
+        return SchemaManager.serialize_message(response_data_type, data)
+
+    @staticmethod
+    def _apply_deadline(timeout: float, headers: dict = None):
+        """
+        Clamps the timeout to the deadline of the request being handled, returns it with headers that carry
+        the timeout to the responder
+        """
+        left = deadline_context.remaining()
+        if left is not None and left < timeout:
+            timeout = left
+            if timeout <= 0:
+                raise NATSTimeoutError()
+        return timeout, {**(headers or {}), deadline_context.HEADER: deadline_context.to_header(timeout)}
 
     async def request(
             self,
@@ -360,6 +764,14 @@ class NATSClient:
             *args,
             **kwargs
     ):
+        """
+        Extra kwargs: coalesce=True - identical requests in flight share a single round trip,
+        cache_ttl - seconds the response is cached for identical requests. They override request_cache_rules.
+        hedge_delay - seconds or "auto", a duplicate request is sent when no reply arrived after the delay,
+        overrides hedge_rules, 0 disables hedging
+        """
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(subject, can_drop=False)
         return await self._request_wrapped(
             subject=subject,
             message=message,
@@ -370,6 +782,105 @@ class NATSClient:
             **kwargs
         )
 
+    async def request_many(
+            self,
+            subjects_or_messages: Iterable[Union[str, tuple]],
+            message=None,
+            timeout: float = 10,
+            max_concurrency: int = None,
+            min_responses: int = None,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ) -> List["RequestResult"]:
+        """
+        Scatter-gather request, returns list of RequestResult in order of arrival.
+        See request_many_iter for parameters
+        """
+        return [
+            result
+            async for result in self.request_many_iter(
+                subjects_or_messages,
+                message=message,
+                timeout=timeout,
+                max_concurrency=max_concurrency,
+                min_responses=min_responses,
+                response_data_type=response_data_type,
+                headers=headers,
+            )
+        ]
+
+    async def request_many_iter(
+            self,
+            subjects_or_messages: Iterable[Union[str, tuple]],
+            message=None,
+            timeout: float = 10,
+            max_concurrency: int = None,
+            min_responses: int = None,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ) -> AsyncIterator["RequestResult"]:
+        """
+        Scatter-gather request, yields RequestResult as soon as each response or error arrives
+        :param subjects_or_messages: subjects to request with the same message or (subject, message) tuples
+        :param message: message for items given as subjects only
+        :param timeout: deadline in seconds for the whole scatter-gather
+        :param max_concurrency: max number of requests in flight, None - unlimited
+        :param min_responses: stop and cancel the remaining requests after this number of successful responses
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        results = asyncio.Queue()
+
+        async def single_request(subject: str, request_message):
+            try:
+                if slots is not None:
+                    await slots.acquire()
+                try:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise NATSTimeoutError()
+                    response = await self.request(
+                        subject,
+                        request_message,
+                        timeout=remaining,
+                        response_data_type=response_data_type,
+                        headers=headers,
+                    )
+                finally:
+                    if slots is not None:
+                        slots.release()
+                result = RequestResult(subject, request_message, response=response)
+            except Exception as e:
+                result = RequestResult(subject, request_message, error=e)
+            results.put_nowait(result)
+
+        tasks = [
+            asyncio.ensure_future(single_request(subject, request_message))
+            for subject, request_message in self._request_items(subjects_or_messages, message)
+        ]
+        successes = 0
+        try:
+            for _ in range(len(tasks)):
+                result = await results.get()
+                successes += result.success
+                yield result
+                if min_responses and successes >= min_responses:
+                    return
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _request_items(subjects_or_messages: Iterable[Union[str, tuple]], message):
+        if message is None:
+            message = {}
+        for item in subjects_or_messages:
+            if isinstance(item, str):
+                yield item, message
+            else:
+                yield item[0], item[1]
+
     async def _publish_js(
             self,
             subject: str,
@@ -399,6 +910,8 @@ class NATSClient:
             data_type: type = dict,
             headers: dict = None,
     ):
+        if self.rate_limiter and not await self.rate_limiter.acquire(subject):
+            return
         return await self._publish_js(
             subject=subject,
             message=message,
@@ -409,12 +922,63 @@ class NATSClient:
         )
 
     def disconnect_sync(self):
-        self.loop.run_until_complete(self.disconnect())
+        self._run_sync(self.disconnect())
 
-    async def disconnect(self):
-        await self.client.drain()
+    async def disconnect(self, timeout: float = None):
+        """
+        Graceful shutdown: stops subscriptions, waits for in-flight handlers and closes the connection
+        after all publishes are flushed
+        :param timeout: max time in seconds to wait for handlers, drain_timeout by default
+        """
+        await self.drain_handlers(self.drain_timeout if timeout is None else timeout)
+        await self.sync_bridge.close()
+        if self.publish_pipeline is not None:
+            await self.publish_pipeline.write()
+        self.connection_monitor.stop()
+        await self.connections.drain()
+        self.executor_manager.shutdown()
         self.logger.warning("Disconnected")
 
+    async def drain_handlers(self, timeout: float):
+        """
+        Unsubscribes all listeners, messages already received are still handled, and waits up to timeout
+        seconds for in-flight handlers. Handlers left after the timeout are cancelled
+        """
+        deadline = self.loop.time() + timeout
+        subs = [sub for subs in (*self.sub_map.values(), *self.js_stream_map.values()) for sub in subs]
+        unsubscribed = asyncio.ensure_future(
+            asyncio.gather(*(sub.drain() for sub in subs), return_exceptions=True)
+        )
+        batches_flushed = False
+        while not unsubscribed.done() or not batches_flushed or self.handler_tasks:
+            if unsubscribed.done() and not batches_flushed:
+                # messages collected by batch listeners are not handled yet
+                batches_flushed = True
+                for handler in self._batch_handlers():
+                    await handler.flush()
+                continue
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            pending = sum(sub.pending_msgs for sub in subs)
+            self.logger.info(f"Draining: {len(self.handler_tasks)} handlers in flight, {pending} messages pending")
+            await asyncio.wait({unsubscribed, *self.handler_tasks}, timeout=min(1.0, remaining))
+
+        if not unsubscribed.done():
+            unsubscribed.cancel()
+        if self.handler_tasks:
+            self.logger.warning(f"Drain timeout, {len(self.handler_tasks)} in-flight handlers cancelled")
+            for task in list(self.handler_tasks):
+                task.cancel()
+        else:
+            self.logger.info("Drained, all in-flight handlers finished")
+
+    def _batch_handlers(self) -> list:
+        handlers = list(self.handler_map.values())
+        for dispatcher in self.dispatchers.values():
+            handlers.extend(dispatcher.handlers)
+        return [handler for handler in handlers if isinstance(handler, _BatchMessageHandler)]
+
     def check_connection(self):
         if self.client._status is NATS.CONNECTED:
             self.logger.info("NATS Client status: CONNECTED")
@@ -435,64 +999,150 @@ class NATSClient:
             return subscriptions
 
     def _filter_include(self, subscriptions: Dict):
-        def subject_included(subject):
-            for subject_included in self.include_subjects:
-                if subject_included not in subject:
-                    continue
-                return True
         return {
             subject: listeners
             for subject, listeners in subscriptions.items()
-            if subject_included(subject)
+            if any(self._filter_matches(f, subject) for f in self.include_subjects)
         }
 
     def _filter_exclude(self, subscriptions: Dict):
-        def subject_excluded(subject):
-            for subject_excluded in self.exclude_subjects:
-                if subject_excluded in subject:
-                    return False
-            return True
         return {
             subject: listeners
             for subject, listeners in subscriptions.items()
-            if subject_excluded(subject)
+            if not any(self._filter_matches(f, subject) for f in self.exclude_subjects)
         }
 
+    @staticmethod
+    def _filter_matches(subject_filter: str, subject: str) -> bool:
+        # filters with wildcards are NATS subject patterns, others are substrings of a subject
+        if is_wildcard_pattern(subject_filter):
+            return pattern_covers(subject_filter, subject)
+        return subject_filter in subject
+
+
 class _ReceivedMessageHandler:
-    def __init__(self, publish_func, cb, data_type):
+    def __init__(
+            self,
+            publish_func,
+            cb,
+            data_type,
+            max_in_flight: int = None,
+            request_cb=None,
+            tasks: set = None,
+            cache: ReplyCache = None,
+            scheduler: PriorityScheduler = None,
+            lane=None,
+    ):
+        """
+        :param cb: callback (with listen_publish middlewares) for messages without reply
+        :param request_cb: callback (with listen_request middlewares) for messages with reply, cb if None
+        :param tasks: registry of in-flight handler tasks shared by all handlers of the client
+        :param cache: cache of encoded responses to requests, a hit skips decoding, middlewares and the callback
+        :param scheduler: shared PriorityScheduler, handlers wait for a slot in the priority lane of the listener
+        """
         self.publish_func = publish_func
         self.cb = cb
         self.data_type = data_type
         self.cb_is_async = asyncio.iscoroutinefunction(cb)
+        self.request_cb = request_cb or cb
+        self.request_cb_is_async = asyncio.iscoroutinefunction(self.request_cb)
         self.logger = get_logger("panini")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.tasks = tasks
+        self.cache = cache
+        # requests dropped because their panini-timeout had passed
+        self.expired = 0
+        self.scheduler = scheduler
+        self.lane = lane
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight else None
 
     async def call(self, msg):
-        asyncio.ensure_future(self._call(msg))
+        # the timeout starts on receipt, time spent waiting for a slot counts
+        deadline = self._deadline(msg)
+        if self.cache is not None and msg.reply:
+            key = self.cache.key(msg.subject, msg.data, msg.headers)
+            response = self.cache.get(key)
+            if response is not None:
+                await self.publish_func(msg.reply, response)
+                return
+            await self._run_in_background(self._call_cached(msg, key, deadline))
+            return
+        await self._run_in_background(self._call(msg, deadline))
 
     async def call_js(self, msg):
-        asyncio.ensure_future(self._call_js(msg))
+        await self._run_in_background(self._call_js(msg, self._deadline(msg)))
+
+    @staticmethod
+    def _deadline(msg) -> Optional[float]:
+        if not msg.reply or not msg.headers:
+            return None
+        return deadline_context.from_headers(msg.headers)
 
-    async def _call(self, msg):
-        reply_to, response = await self._call_main(msg)
+    async def _run_in_background(self, coro):
+        # while all slots are busy, nats-py keeps next messages in the subscription pending queue,
+        # so pending_bytes_limit and slow consumer errors protect the service from a burst
+        if self._slots is not None:
+            await self._slots.acquire()
+        self.in_flight += 1
+        if self.scheduler is not None:
+            coro = self.scheduler.run(self.lane, coro)
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(self._release_slot)
+        if self.tasks is not None:
+            self.tasks.add(task)
+
+    def _release_slot(self, task):
+        self.in_flight -= 1
+        if self.tasks is not None:
+            self.tasks.discard(task)
+        if self._slots is not None:
+            self._slots.release()
+
+    async def _call(self, msg, deadline: float = None):
+        reply_to, response = await self._call_main(msg, deadline)
         if reply_to is not None:
             await self.publish_func(reply_to, response)
 
-    async def _call_js(self, msg):
-        reply_to, response = await self._call_main(msg)
+    async def _call_cached(self, msg, key, deadline: float = None):
+        reply_to, response = await self._call_main(msg, deadline)
+        if reply_to is None:
+            return
+        response = SchemaManager.deserialize_message(type(response), response)
+        self.cache.set(key, response)
+        await self.publish_func(reply_to, response)
+
+    async def _call_js(self, msg, deadline: float = None):
+        reply_to, response = await self._call_main(msg, deadline)
         if reply_to is not None:
             if reply_to.startswith("$JS."):
                 return
             await self.publish_func(reply_to, response)
 
-    async def _call_main(self, msg):
+    async def _call_main(self, msg, deadline: float = None):
+        """
+        :param deadline: time.monotonic() deadline of the request, taken from its panini-timeout on receipt
+        """
         reply_to = self.match_msg_case(msg)
+        if reply_to is not None and deadline is not None:
+            if deadline <= time.monotonic():
+                # the requester doesn't wait for the response anymore
+                self.expired += 1
+                return None, None
+            # every message is handled in its own task, so the deadline is seen by this handler only
+            deadline_context.set_current(deadline)
         msg_error = self.parse_data(msg)
         if msg_error:
             return reply_to, msg_error
-        if self.cb_is_async:
-            response = await self.cb(msg)
+        if reply_to is None:
+            if self.cb_is_async:
+                response = await self.cb(msg)
+            else:
+                response = self.cb(msg)
+        elif self.request_cb_is_async:
+            response = await self.request_cb(msg)
         else:
-            response = self.cb(msg)
+            response = self.request_cb(msg)
         return reply_to, response
 
     def parse_data(self, msg):
@@ -511,3 +1161,203 @@ class _ReceivedMessageHandler:
         else:
             reply_to = None
         return reply_to
+
+
+class _SubjectDispatcher:
+    """
+    Routes messages of a single wildcard NATS subscription to listeners' handlers.
+    A handler with all max_in_flight slots busy gets its messages in its own backlog, so a slow listener
+    doesn't hold the shared subscription and messages of other listeners
+    """
+
+    def __init__(self, backlog_size: int = 1024):
+        """
+        :param backlog_size: max messages waiting for a slot of a single handler, when the backlog is full
+                             the dispatcher waits and next messages stay in the subscription pending queue
+        """
+        self.index = SubjectIndex()
+        self.handlers = []
+        self.sub = None
+        self.unrouted = 0
+        self.max_in_flight = None
+        self.backlog_size = backlog_size
+        self._backlogs: Dict[Any, asyncio.Queue] = {}
+        self._pumps: Dict[Any, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(handler.in_flight for handler in self.handlers)
+
+    @property
+    def expired(self) -> int:
+        return sum(handler.expired for handler in self.handlers)
+
+    @property
+    def backlog(self) -> int:
+        return sum(backlog.qsize() for backlog in self._backlogs.values())
+
+    def add(self, subject: str, handler):
+        self.index.add(subject, handler)
+        self.handlers.append(handler)
+
+    def remove(self, subject: str) -> bool:
+        removed = self.index.remove(subject)
+        self.handlers = [h for h in self.handlers if all(h is not r for r in removed)]
+        for handler in removed:
+            self._backlogs.pop(handler, None)
+            pump = self._pumps.pop(handler, None)
+            if pump is not None:
+                pump.cancel()
+        return bool(removed)
+
+    async def call(self, msg):
+        handlers = self.index.match(msg.subject)
+        if not handlers:
+            self.unrouted += 1
+            return
+        for handler in handlers[1:]:
+            # every handler decodes msg.data in place, so it gets its own copy
+            await self._dispatch(handler, dataclasses.replace(msg))
+        await self._dispatch(handlers[0], msg)
+
+    async def _dispatch(self, handler, msg):
+        pump = self._pumps.get(handler)
+        if handler._slots is None or (not handler._slots.locked() and (pump is None or pump.done())):
+            # a free slot, the handler starts a task without waiting
+            await handler.call(msg)
+            return
+        backlog = self._backlogs.get(handler)
+        if backlog is None:
+            backlog = self._backlogs[handler] = asyncio.Queue(self.backlog_size)
+        await backlog.put(msg)
+        if pump is None or pump.done():
+            pump = self._pumps[handler] = asyncio.ensure_future(self._pump(handler, backlog))
+            if handler.tasks is not None:
+                # graceful drain waits for the backlog as for in-flight handlers
+                handler.tasks.add(pump)
+                pump.add_done_callback(handler.tasks.discard)
+
+    @staticmethod
+    async def _pump(handler, backlog: asyncio.Queue):
+        while not backlog.empty():
+            # waits for a free slot of the handler, messages keep their order
+            await handler.call(backlog.get_nowait())
+
+
+@dataclass
+class RequestResult:
+    """
+    Single response (or error) of a scatter-gather request
+    """
+    subject: str
+    message: Any
+    response: Any = None
+    error: Exception = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class MsgBatch:
+    """
+    Group of messages delivered to a listener with batch_size at once.
+    Middlewares see the whole batch as a single message, callback gets decoded data of every message
+    """
+    subject: str
+    msgs: List[Msg]
+    reply: str = ""
+    headers: dict = None
+
+    @property
+    def data(self) -> list:
+        return [msg.data for msg in self.msgs]
+
+    def __iter__(self):
+        return iter(self.msgs)
+
+    def __len__(self):
+        return len(self.msgs)
+
+
+class _BatchMessageHandler(_ReceivedMessageHandler):
+    def __init__(
+            self,
+            publish_func,
+            cb,
+            data_type,
+            subject: str,
+            batch_size: int,
+            batch_timeout: float = 100,
+            max_in_flight: int = None,
+            tasks: set = None,
+            scheduler: PriorityScheduler = None,
+            lane=None,
+    ):
+        """
+        :param batch_size: max number of messages in a batch
+        :param batch_timeout: max time in milliseconds to wait for a batch to fill up
+        """
+        super().__init__(
+            publish_func, cb, data_type, max_in_flight=max_in_flight, tasks=tasks, scheduler=scheduler, lane=lane
+        )
+        self.subject = subject
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout / 1000
+        self._batch = []
+        self._batch_timer = None
+
+    async def call(self, msg):
+        self._batch.append(msg)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+        elif self._batch_timer is None:
+            self._batch_timer = asyncio.get_event_loop().call_later(
+                self.batch_timeout, self._on_batch_timeout
+            )
+
+    async def call_js(self, msg):
+        await self.call(msg)
+
+    def _on_batch_timeout(self):
+        self._batch_timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        if not self._batch:
+            return
+        msgs, self._batch = self._batch, []
+        await self._run_in_background(self._call_batch(msgs))
+
+    async def _call_batch(self, msgs: List[Msg]):
+        batch = MsgBatch(subject=self.subject, msgs=self.parse_batch(msgs))
+        if not batch.msgs:
+            return
+        if self.cb_is_async:
+            await self.cb(batch)
+        else:
+            self.cb(batch)
+
+    def parse_batch(self, msgs: List[Msg]) -> List[Msg]:
+        try:
+            batch_data = SchemaManager.serialize_messages(
+                data_type=self.data_type,
+                messages=[msg.data for msg in msgs]
+            )
+        except MessageSchemaError:
+            # find and drop broken messages, the rest of the batch is still delivered
+            valid_msgs = []
+            for msg in msgs:
+                try:
+                    if not self.parse_data(msg):
+                        valid_msgs.append(msg)
+                except Exception as e:
+                    self.logger.error(f"Message dropped from batch {self.subject}: {e}")
+            return valid_msgs
+        for msg, data in zip(msgs, batch_data):
+            msg.data = data
+        return msgs
@@ -0,0 +1,128 @@
+import asyncio
+import collections
+import time
+from typing import Dict, Optional
+
+PRIORITIES = ("high", "normal", "low")
+
+
+class _Lane:
+    def __init__(self, name: str):
+        self.name = name
+        # (future, enqueued_at) of handlers waiting for a slot
+        self.waiters = collections.deque()
+        self.dispatched = 0
+        self.max_queued = 0
+        self.wait_total = 0.0
+        self.max_wait = 0.0
+        self.aged = 0
+
+    def head_enqueued_at(self) -> Optional[float]:
+        while self.waiters and self.waiters[0][0].done():
+            # cancelled while waiting
+            self.waiters.popleft()
+        return self.waiters[0][1] if self.waiters else None
+
+    def stats(self) -> dict:
+        return {
+            "queued": sum(1 for future, _ in self.waiters if not future.done()),
+            "max_queued": self.max_queued,
+            "dispatched": self.dispatched,
+            "avg_wait": self.wait_total / self.dispatched if self.dispatched else 0.0,
+            "max_wait": self.max_wait,
+            "aged": self.aged,
+        }
+
+
+class PriorityScheduler:
+    """
+    Shared limit of concurrently running handlers, handlers waiting for a free slot are dispatched
+    by listener priority: "high" ones before queued "normal" and "low" ones, FIFO within a lane.
+    A handler waiting longer than max_wait is dispatched first whatever its priority, so a flood of high
+    priority messages can't starve other lanes
+    """
+
+    def __init__(self, concurrency: int, max_wait: float = 1.0):
+        """
+        :param concurrency: max number of handlers running at the same time
+        :param max_wait: seconds after which a waiting handler of a lower priority lane is dispatched first
+        """
+        assert concurrency > 0, "priority_concurrency must be a positive number"
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.running = 0
+        self.lanes: Dict[str, _Lane] = {name: _Lane(name) for name in PRIORITIES}
+
+    def lane(self, priority: str) -> _Lane:
+        assert priority in self.lanes, f"priority must be one of {PRIORITIES}, got {priority!r}"
+        return self.lanes[priority]
+
+    async def run(self, lane: _Lane, coro):
+        """
+        Runs the handler coroutine when a slot is given to its lane
+        """
+        try:
+            await self._acquire(lane)
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            self._release()
+
+    async def _acquire(self, lane: _Lane):
+        if self.running < self.concurrency and not self._has_waiters():
+            self.running += 1
+            lane.dispatched += 1
+            return
+        future = asyncio.get_event_loop().create_future()
+        lane.waiters.append((future, time.monotonic()))
+        lane.max_queued = max(lane.max_queued, len(lane.waiters))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was given right before the cancellation
+                self._release()
+            raise
+
+    def _release(self):
+        self.running -= 1
+        while self.running < self.concurrency:
+            lane = self._next_lane()
+            if lane is None:
+                return
+            future, enqueued_at = lane.waiters.popleft()
+            waited = time.monotonic() - enqueued_at
+            lane.dispatched += 1
+            lane.wait_total += waited
+            lane.max_wait = max(lane.max_wait, waited)
+            self.running += 1
+            future.set_result(None)
+
+    def _has_waiters(self) -> bool:
+        return any(lane.head_enqueued_at() is not None for lane in self.lanes.values())
+
+    def _next_lane(self) -> Optional[_Lane]:
+        first = None
+        oldest, oldest_enqueued_at = None, None
+        for lane in self.lanes.values():
+            enqueued_at = lane.head_enqueued_at()
+            if enqueued_at is None:
+                continue
+            if first is None:
+                first = lane
+            if oldest_enqueued_at is None or enqueued_at < oldest_enqueued_at:
+                oldest, oldest_enqueued_at = lane, enqueued_at
+        if oldest is not None and oldest is not first and time.monotonic() - oldest_enqueued_at > self.max_wait:
+            oldest.aged += 1
+            return oldest
+        return first
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+        }
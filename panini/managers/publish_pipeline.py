@@ -0,0 +1,100 @@
+import asyncio
+from typing import Optional
+
+from nats.aio.client import Client as NATS
+
+
+class PublishPipeline:
+    """
+    High-throughput publish mode: outgoing messages are buffered and written to the NATS client
+    in bursts, when the buffer reaches buffer_size bytes or flush_interval seconds passed.
+    Forced publishes of the same loop tick share a single flush
+    """
+
+    def __init__(
+            self,
+            client: NATS,
+            buffer_size: int = 65536,
+            flush_interval: float = 0.0,
+    ):
+        """
+        :param client: connected nats-py client
+        :param buffer_size: buffered bytes that trigger a write
+        :param flush_interval: max time in seconds a message waits in the buffer,
+                               0 - write on the next loop iteration
+        """
+        self.client = client
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._write_timer: Optional[asyncio.TimerHandle] = None
+        self._flush_future: Optional[asyncio.Future] = None
+        # client.publish yields when its pending buffer is full, a single writer at a time keeps the order
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def pending_msgs(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._buffer_bytes
+
+    async def publish(
+            self,
+            subject: str,
+            payload: bytes,
+            reply_to: str = "",
+            headers: dict = None,
+            force: bool = False,
+    ):
+        self._buffer.append((subject, payload, reply_to or "", headers))
+        self._buffer_bytes += len(payload)
+        if self._buffer_bytes >= self.buffer_size:
+            await self.write()
+        elif self._write_timer is None:
+            self._write_timer = asyncio.get_event_loop().call_later(
+                self.flush_interval, self._on_write_timer
+            )
+        if force:
+            await self.flush()
+
+    def _on_write_timer(self):
+        self._write_timer = None
+        asyncio.ensure_future(self.write())
+
+    async def write(self):
+        """
+        Moves all buffered messages to the NATS client, it sends them to the socket with a single write.
+        Concurrent writes wait for the previous one, so messages are passed to the client in publish order
+        """
+        if self._write_timer is not None:
+            self._write_timer.cancel()
+            self._write_timer = None
+        async with self._write_lock:
+            buffer, self._buffer = self._buffer, []
+            self._buffer_bytes = 0
+            for subject, payload, reply_to, headers in buffer:
+                await self.client.publish(
+                    subject=subject, payload=payload, reply=reply_to, headers=headers
+                )
+
+    async def flush(self):
+        """
+        Waits until everything published so far has reached the NATS broker
+        """
+        if self._flush_future is None:
+            self._flush_future = asyncio.get_event_loop().create_future()
+            asyncio.ensure_future(self._shared_flush())
+        await asyncio.shield(self._flush_future)
+
+    async def _shared_flush(self):
+        future, self._flush_future = self._flush_future, None
+        try:
+            await self.write()
+            await self.client.flush()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Dict
+
+from panini.exceptions import RateLimitExceededError
+from panini.utils.subject_index import SubjectRules
+from panini.utils.token_bucket import TokenBucket
+
+OVERFLOW = ("wait", "drop", "raise")
+
+
+class _Limit:
+    __slots__ = ("pattern", "bucket", "overflow", "allowed", "delayed", "dropped", "rejected")
+
+    def __init__(self, pattern: str, bucket: TokenBucket, overflow: str):
+        self.pattern = pattern
+        self.bucket = bucket
+        self.overflow = overflow
+        self.allowed = 0
+        self.delayed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    async def acquire(self, subject: str, can_drop: bool) -> bool:
+        if self.overflow == "wait":
+            delay = self.bucket.reserve()
+            if delay:
+                self.delayed += 1
+                await asyncio.sleep(delay)
+            self.allowed += 1
+            return True
+        if self.bucket.try_take():
+            self.allowed += 1
+            return True
+        if self.overflow == "drop" and can_drop:
+            self.dropped += 1
+            return False
+        self.rejected += 1
+        raise RateLimitExceededError(
+            f"Rate limit {self.bucket.rate}/s of {self.pattern} is exceeded, subject: {subject}"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "overflow": self.overflow,
+            "allowed": self.allowed,
+            "delayed": self.delayed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimiter:
+    """
+    Client-side rate limits of outgoing messages by subject pattern, all subjects matched by a pattern
+    share its token bucket. The first matching pattern in the order limits were set is applied,
+    subjects are matched by a subject trie with a cache of recent subjects
+    """
+
+    def __init__(self):
+        self.rules = SubjectRules()
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def set_limit(self, pattern: str, rate: float, burst: float = None, overflow: str = "wait"):
+        """
+        :param pattern: subject pattern, `*` and `>` wildcards are supported
+        :param rate: messages per second
+        :param burst: max number of messages sent at once after a pause, max(1, rate) by default
+        :param overflow: "wait" - until a token is there, "drop" - the message is not sent,
+                         "raise" - RateLimitExceededError. Requests can't be dropped, "drop" raises for them
+        """
+        assert overflow in OVERFLOW, f"overflow must be one of {OVERFLOW}"
+        self.rules.set(pattern, _Limit(pattern, TokenBucket(rate, burst), overflow))
+
+    def remove_limit(self, pattern: str) -> bool:
+        return self.rules.remove(pattern)
+
+    async def acquire(self, subject: str, can_drop: bool = True) -> bool:
+        """
+        Returns False if the message must be dropped
+        """
+        limit = self.rules.match(subject)
+        if limit is None:
+            return True
+        return await limit.acquire(subject, can_drop)
+
+    def stats(self) -> Dict[str, dict]:
+        return {pattern: limit.stats() for pattern, limit in self.rules.rules.items()}
@@ -0,0 +1,115 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from nats.errors import TimeoutError as NATSClientTimeoutError
+
+from panini.exceptions import NATSTimeoutError
+from panini.utils import deadline as deadline_context
+from panini.utils.reply_cache import ReplyCache
+from panini.utils.subject_index import SubjectRules
+
+
+class RequestCache:
+    """
+    Saves request round trips: identical requests (same subject, payload and headers) in flight at the same time
+    share a single round trip ("singleflight"), and responses can be cached for a TTL.
+    Both are enabled by subject pattern rules or for a single call.
+    Every caller waits for a shared round trip no longer than its own timeout. The round trip is sent
+    with the timeout and the panini-timeout of the caller that started it, if it times out earlier than
+    the timeout of another caller, that caller sends a new one
+    """
+
+    def __init__(self, rules: Dict[str, dict] = None, max_size: int = 1024):
+        """
+        :param rules: subject patterns with options, e.g. {"config.>": {"coalesce": True, "cache_ttl": 5}},
+                      the first matching pattern in the dict order is applied
+        :param max_size: max number of cached responses, the least recently used ones are evicted
+        """
+        for pattern, options in (rules or {}).items():
+            unknown = set(options) - {"coalesce", "cache_ttl"}
+            assert not unknown, f"Unknown request cache options {unknown} for {pattern}"
+        self.rules = SubjectRules(rules)
+        self.cache = ReplyCache(max_size=max_size)
+        self.round_trips = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Tuple[str, bytes], asyncio.Task] = {}
+
+    def options(self, subject: str, coalesce: Optional[bool] = None, cache_ttl: Optional[float] = None):
+        """
+        Returns (coalesce, cache_ttl) for the subject, arguments of a call override the rules
+        """
+        if coalesce is None or cache_ttl is None:
+            rule = self.rules.match(subject, {})
+            if coalesce is None:
+                coalesce = rule.get("coalesce")
+            if cache_ttl is None:
+                cache_ttl = rule.get("cache_ttl")
+        return bool(coalesce), cache_ttl
+
+    def key(self, subject: str, payload: bytes, headers: dict = None) -> tuple:
+        subject, payload_hash, _ = self.cache.key(subject, payload)
+        # the deadline differs for every call, it is covered by the timeout of every caller
+        headers = {name: value for name, value in (headers or {}).items() if name != deadline_context.HEADER}
+        return subject, payload_hash, tuple(sorted(headers.items()))
+
+    async def request(
+            self,
+            subject: str,
+            payload: bytes,
+            send: Callable[[float], Awaitable[bytes]],
+            coalesce: bool,
+            cache_ttl: Optional[float],
+            timeout: float,
+            headers: dict = None,
+    ) -> bytes:
+        """
+        Returns the raw response to the payload, send(timeout) does the round trip when it can't be saved
+        """
+        key = self.key(subject, payload, headers)
+        if cache_ttl:
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            task = self._in_flight.get(key) if coalesce else None
+            started = task is None
+            if started:
+                self.round_trips += 1
+                task = asyncio.ensure_future(send(remaining))
+                task.add_done_callback(lambda done: self._on_response(key, done, coalesce, cache_ttl))
+                if coalesce:
+                    self._in_flight[key] = task
+            else:
+                self.coalesced += 1
+            try:
+                # a cancelled or timed out caller doesn't cancel the round trip other callers are waiting for
+                return await asyncio.wait_for(asyncio.shield(task), remaining)
+            except (asyncio.TimeoutError, NATSClientTimeoutError):
+                if not task.done():
+                    raise NATSTimeoutError()
+                if started or deadline - loop.time() <= 0:
+                    raise
+                # the joined round trip timed out before the timeout of this caller
+
+    def _on_response(self, key, task: asyncio.Task, coalesce: bool, cache_ttl: Optional[float]):
+        if coalesce and self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled():
+            return
+        # retrieved here, so an error nobody waits for anymore isn't reported as never retrieved
+        if task.exception() is None and cache_ttl:
+            self.cache.set(key, task.result(), cache_ttl)
+
+    def stats(self) -> dict:
+        return {
+            "round_trips": self.round_trips,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache.hits,
+            "saved": self.coalesced + self.cache.hits,
+            "cache_size": len(self.cache),
+            "in_flight": len(self._in_flight),
+        }
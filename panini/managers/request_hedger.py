@@ -0,0 +1,151 @@
+import asyncio
+import collections
+import time
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from panini.utils.subject_index import SubjectRules
+
+AUTO = "auto"
+
+
+class _LatencyWindow:
+    """
+    Latencies of the last requests to a subject and their percentile, recalculated every few samples
+    """
+
+    def __init__(self, size: int, percentile: float, recalculate_every: int = 16):
+        self.samples = collections.deque(maxlen=size)
+        self.percentile = percentile
+        self.recalculate_every = recalculate_every
+        self.value: Optional[float] = None
+        self._added = 0
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+        self._added += 1
+        if self._added % self.recalculate_every == 0:
+            ordered = sorted(self.samples)
+            self.value = ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)]
+
+
+class RequestHedger:
+    """
+    Hedged requests: when no reply arrived after the hedge delay, a duplicate request is sent (e.g. to another
+    member of the queue group), the first reply wins and the other request is cancelled.
+    Extra requests are limited by a token bucket: every hedged subject request adds budget tokens,
+    every hedge takes one, the balance is capped by max_tokens, so a burst of slow replies can't double the load
+    """
+
+    def __init__(
+            self,
+            rules: Dict[str, Union[float, str]] = None,
+            budget: float = 0.1,
+            max_tokens: float = 10,
+            percentile: float = 0.95,
+            min_samples: int = 20,
+            window: int = 256,
+    ):
+        """
+        :param rules: hedge delay by subject pattern - seconds or "auto" for the observed latency percentile
+                      of the subject, e.g. {"prices.*": "auto", "users.get": 0.05}
+        :param budget: tokens added by every request, the long-term max ratio of hedges to requests
+        :param max_tokens: max balance of the budget, the number of hedges allowed in a row
+        :param percentile: latency percentile used as the delay for "auto"
+        :param min_samples: "auto" subjects are not hedged until that many latencies are observed
+        :param window: number of last latencies the percentile is calculated from
+        """
+        assert 0 <= budget <= 1, "hedge_budget must be between 0 and 1"
+        assert max_tokens >= 1, "max_tokens must be at least 1"
+        assert 0 < percentile < 1, "hedge_percentile must be between 0 and 1"
+        self.rules = SubjectRules(rules)
+        self.budget = budget
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self._latencies: Dict[str, _LatencyWindow] = {}
+
+    def policy(self, subject: str, hedge_delay: Union[float, str, None] = None) -> Union[float, str, None]:
+        """
+        Returns the hedge delay for the subject, hedge_delay of a call overrides the rules, 0 or False disables
+        """
+        if hedge_delay is None:
+            hedge_delay = self.rules.match(subject)
+        return hedge_delay or None
+
+    def delay(self, subject: str, policy: Union[float, str]) -> Optional[float]:
+        if policy != AUTO:
+            return policy
+        latencies = self._latencies.get(subject)
+        if latencies is None or len(latencies.samples) < self.min_samples:
+            return None
+        return latencies.value
+
+    async def request(
+            self,
+            subject: str,
+            send: Callable[[float], Awaitable],
+            policy: Union[float, str],
+            timeout: float,
+    ):
+        """
+        :param send: sends a single request with the given timeout
+        """
+        self.requests += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.budget)
+        started = time.monotonic()
+        delay = self.delay(subject, policy)
+        primary = asyncio.ensure_future(send(timeout))
+        tasks = [primary]
+        try:
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(send(timeout - delay)))
+            response, winner = await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        if winner is not primary:
+            self.wins += 1
+        if policy == AUTO:
+            self._record(subject, time.monotonic() - started)
+        return response
+
+    @staticmethod
+    async def _first_success(tasks: list):
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task
+        # all of them failed, the error of the primary request is raised
+        for task in tasks[1:]:
+            task.exception()
+        raise tasks[0].exception()
+
+    def _record(self, subject: str, latency: float):
+        latencies = self._latencies.get(subject)
+        if latencies is None:
+            latencies = self._latencies[subject] = _LatencyWindow(self.window, self.percentile)
+        latencies.add(latency)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "wins": self.wins,
+            "budget": self.budget,
+            "budget_tokens": self.tokens,
+            "delays": {
+                subject: latencies.value for subject, latencies in self._latencies.items()
+            },
+        }
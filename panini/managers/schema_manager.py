@@ -25,6 +25,19 @@ class SchemaManager:
                 raise MessageSchemaError(f'Unexpected serialization error: {e}')
         raise MessageSchemaError(f'Unexpected data_type: {data_type}, message: {message}')
 
+    @staticmethod
+    def serialize_messages(data_type, messages: List[bytes]) -> list:
+        """
+        Serializes many messages of the same data_type at once.
+        JSON based data types are decoded by a single ujson call for the whole batch
+        """
+        if data_type in (dict, list) or SchemaManager._is_json_data_type(data_type):
+            return SchemaManager._bytes_batch_to_json(data_type, messages)
+        return [
+            SchemaManager.serialize_message(data_type, message)
+            for message in messages
+        ]
+
     @staticmethod
     def deserialize_message(data_type, message: Any):
         if data_type is bytes:
@@ -46,6 +59,27 @@ class SchemaManager:
             f'Unexpected data_type: {data_type}, message: {message}'
         )
 
+    @staticmethod
+    def _is_json_data_type(data_type) -> bool:
+        return data_type not in (bytes, str, Callable) and isinstance(data_type, type)
+
+    @staticmethod
+    def _bytes_batch_to_json(data_type, messages: List[bytes]) -> list:
+        try:
+            data = ujson.loads(b"[" + b",".join(messages) + b"]")
+        except ValueError as e:
+            raise MessageSchemaError(f'Unexpected serialization error: {e}')
+        if len(data) != len(messages):
+            raise MessageSchemaError('Batch contains a message that is not a single JSON value')
+        if data_type in (dict, list):
+            if not all(isinstance(item, data_type) for item in data):
+                raise MessageSchemaError(f'Unexpected data_type in batch, expected: {data_type}')
+            return data
+        try:
+            return [data_type(**item) for item in data]
+        except Exception as e:
+            raise MessageSchemaError(f'Unexpected serialization error: {e}')
+
     @staticmethod
     def _bytes_to_dataclass(data_type: Callable, message: bytes):
         data = ujson.loads(message.decode())
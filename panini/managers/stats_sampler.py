@@ -0,0 +1,77 @@
+from typing import Dict, Optional
+
+from prometheus_client import CollectorRegistry, Gauge
+
+from panini.utils.logger import get_logger
+
+FIELDS = ("pending_msgs", "pending_bytes", "pending_bytes_limit", "delivered", "dropped")
+
+
+class StatsSampler:
+    """
+    Periodically samples pending messages, pending bytes, delivered and dropped (slow consumer) counts
+    of every subscription, publishes them on panini_events.<service>.<client>.stats
+    and sets them to Prometheus gauges
+    """
+
+    def __init__(
+            self,
+            nats_client,
+            service_name: str,
+            registry: Optional[CollectorRegistry] = None,
+    ):
+        """
+        :param nats_client: NATSClient of the app
+        :param registry: Prometheus registry for the gauges, None - gauges are not created
+        """
+        self.nats = nats_client
+        self.service_name = service_name
+        self.logger = get_logger("panini")
+        self.gauges: Dict[str, Gauge] = {}
+        if registry is not None:
+            self.gauges = {
+                field: Gauge(
+                    f"panini_subscription_{field}",
+                    f"Subscription {field.replace('_', ' ')}, sampled",
+                    labelnames=("app_name", "client_nats_name", "subject"),
+                    registry=registry,
+                )
+                for field in FIELDS
+            }
+
+    @property
+    def subject(self) -> str:
+        return f"panini_events.{self.service_name}.{self.nats.client_nats_name}.stats"
+
+    def sample(self) -> Dict[str, list]:
+        """
+        Returns [pending_msgs, pending_bytes, pending_bytes_limit, delivered, dropped] for every subscribed subject,
+        numbers of subscriptions with the same subject are summed up. delivered is the number of messages
+        delivered by the server, dropped ones included
+        """
+        dropped = self.nats.connection_monitor.slow_consumer_drops
+        stats = {}
+        for subject, subs in {**self.nats.sub_map, **self.nats.js_stream_map}.items():
+            row = [0] * len(FIELDS)
+            for sub in subs:
+                row[0] += sub.pending_msgs
+                row[1] += sub.pending_bytes
+                row[2] += sub._pending_bytes_limit
+                row[3] += sub.delivered
+                row[4] += dropped.get(sub, 0)
+            stats[subject] = row
+        return stats
+
+    async def publish_stats(self):
+        try:
+            stats = self.sample()
+            for field_index, field in enumerate(FIELDS):
+                gauge = self.gauges.get(field)
+                if gauge is None:
+                    continue
+                for subject, row in stats.items():
+                    gauge.labels(self.service_name, self.nats.client_nats_name, subject).set(row[field_index])
+            if self.nats.client.is_connected:
+                await self.nats._publish(self.subject, {"fields": FIELDS, "subscriptions": stats})
+        except Exception as e:
+            self.logger.warning(f"Failed to publish subscription stats: {e!r}")
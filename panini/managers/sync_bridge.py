@@ -0,0 +1,148 @@
+import asyncio
+import collections
+import concurrent.futures
+from typing import Optional
+
+from panini.utils.logger import get_logger
+
+
+class SyncBridge:
+    """
+    Thread-safe client for synchronous code running next to the app (Flask views, Celery tasks, sync listeners
+    with executor="thread"). Requests are scheduled on the app loop and awaited with concurrent.futures,
+    publishes are appended to a queue that the app loop drains in batches: one loop wakeup, one middlewares call
+    and one flush per batch, see NATSClient.publish_many. publish_single() shares the queue and the wakeup,
+    but sends every message with NATSClient.publish, so middlewares see it as a regular publish
+    """
+
+    def __init__(self, nats_client):
+        """
+        :param nats_client: NATSClient of the app, messages go through its middlewares
+        """
+        self.nats = nats_client
+        self.logger = get_logger("panini")
+        # deque.append and popleft are atomic, so producer threads never take a lock
+        self._queue = collections.deque()
+        self._drain_scheduled = False
+        self._drain_task: Optional[asyncio.Task] = None
+        # the first publish error since the last flush(), raised by flush()
+        self._error: Optional[Exception] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.nats.loop
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of publishes waiting for the app loop
+        """
+        return len(self._queue)
+
+    def publish(self, subject: str, message, headers: dict = None):
+        """
+        Queues the message and returns immediately, call flush() to wait until it is sent
+        """
+        self._enqueue((subject, message, headers), True)
+
+    def publish_single(self, subject: str, message, headers: dict = None):
+        """
+        Like publish(), but the message is sent on its own with NATSClient.publish instead of a batch
+        """
+        self._enqueue((subject, message, headers), False)
+
+    def _enqueue(self, item: tuple, batched: bool):
+        self._queue.append((item, batched))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.loop.call_soon_threadsafe(self._start_drain)
+
+    def request(
+            self,
+            subject: str,
+            message,
+            timeout: float = 10,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ):
+        """
+        Blocks the calling thread until the response arrives
+        """
+        self._check_thread()
+        return self.request_future(subject, message, timeout, response_data_type, headers).result()
+
+    def request_future(
+            self,
+            subject: str,
+            message,
+            timeout: float = 10,
+            response_data_type: type = dict,
+            headers: dict = None,
+    ) -> concurrent.futures.Future:
+        """
+        Sends the request and returns concurrent.futures.Future of the response,
+        e.g. to send several requests from a thread and wait for all of them
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.nats.request(subject, message, timeout, response_data_type, headers), self.loop
+        )
+
+    def flush(self, timeout: float = 10):
+        """
+        Blocks the calling thread until all queued messages are written to the NATS connection and flushed.
+        Raises the first publish error since the previous flush()
+        """
+        self._check_thread()
+        asyncio.run_coroutine_threadsafe(self._flush(timeout), self.loop).result()
+
+    def _check_thread(self):
+        if self.nats._in_loop_thread():
+            raise RuntimeError(
+                "SyncBridge blocks the calling thread and can't be used in the app event loop, "
+                "use async app functions instead"
+            )
+
+    def _start_drain(self):
+        # the flag is reset before the queue is read, so a message appended after that schedules a new drain
+        self._drain_scheduled = False
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        while self._queue:
+            # messages queued while the previous batch is flushed form the next batch
+            batch = []
+            for _ in range(len(self._queue)):
+                item, batched = self._queue.popleft()
+                if batched:
+                    batch.append(item)
+                    continue
+                # keeps the order of messages: batched ones queued before this one are sent first
+                await self._send(self.nats.publish_many, batch, batch_size=1000)
+                batch = []
+                subject, message, headers = item
+                await self._send(self.nats.publish, subject, message, headers=headers)
+            await self._send(self.nats.publish_many, batch, batch_size=1000)
+
+    async def _send(self, publish_func, *args, **kwargs):
+        try:
+            await publish_func(*args, **kwargs)
+        except Exception as e:
+            self.logger.exception(f"SyncBridge failed to publish: {e}")
+            if self._error is None:
+                self._error = e
+
+    async def _flush(self, timeout: float):
+        self._start_drain()
+        await asyncio.wait_for(asyncio.shield(self._drain_task), timeout)
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    async def close(self):
+        """
+        Sends messages left in the queue, called on disconnect
+        """
+        if self._queue or (self._drain_task is not None and not self._drain_task.done()):
+            self._start_drain()
+            await self._drain_task
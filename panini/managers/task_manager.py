@@ -72,9 +72,8 @@ class TaskManager:
         if not asyncio.iscoroutinefunction(task):
             raise InitializingTaskError("Only coroutine tasks allowed")
 
-    def create_tasks(self):
+    def create_tasks(self) -> list:
         loop = asyncio.get_event_loop()
-        for task in self._tasks:
-            loop.create_task(task())
+        return [loop.create_task(task()) for task in self._tasks]
 
 
@@ -0,0 +1,133 @@
+import multiprocessing.util
+import os
+import signal
+import time
+import traceback
+from typing import Callable, Dict
+
+from ..utils.logger import get_logger
+
+
+class WorkerManager:
+    """
+    Supervisor of forked worker processes: restarts crashed workers
+    and forwards SIGTERM/SIGINT to all of them
+    """
+
+    forwarded_signals = (signal.SIGTERM, signal.SIGINT)
+
+    def __init__(
+            self,
+            workers: int,
+            run_worker: Callable[[int], None],
+            on_worker_exit: Callable[[], None] = None,
+            restart_delay: float = 1.0,
+            stop_timeout: float = 10.0,
+    ):
+        """
+        :param workers: number of worker processes
+        :param run_worker: runs the worker with the given index inside the forked process
+        :param on_worker_exit: called inside the worker process right before exit
+        :param restart_delay: pause in seconds before a crashed worker is restarted
+        :param stop_timeout: time in seconds workers have to exit after a forwarded signal, then they are killed
+        """
+        assert workers >= 1, "workers must be a positive number"
+        self.workers = workers
+        self.run_worker = run_worker
+        self.on_worker_exit = on_worker_exit
+        self.restart_delay = restart_delay
+        self.stop_timeout = stop_timeout
+        self.logger = get_logger("panini")
+        self._pids: Dict[int, int] = {}
+        self._stopping_since = None
+
+    @property
+    def pids(self) -> Dict[int, int]:
+        return dict(self._pids)
+
+    def run(self):
+        previous_handlers = {
+            signum: signal.signal(signum, self._forward_signal)
+            for signum in self.forwarded_signals
+        }
+        try:
+            for index in range(self.workers):
+                self._spawn(index)
+            self._supervise()
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(index)
+        self._pids[pid] = index
+        self.logger.info(f"Worker {index} started, pid: {pid}")
+
+    def _run_child(self, index: int):
+        # the same reinitialization multiprocessing does for its forked processes (e.g. logging queue)
+        multiprocessing.util._run_after_forkers()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        exit_code = 0
+        try:
+            self.run_worker(index)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            if self.on_worker_exit is not None:
+                self.on_worker_exit()
+            os._exit(exit_code)
+
+    def _supervise(self):
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if (
+                        self._stopping_since is not None
+                        and time.monotonic() - self._stopping_since > self.stop_timeout
+                ):
+                    self._send_signal(signal.SIGKILL)
+                time.sleep(0.1)
+                continue
+
+            index = self._pids.pop(pid, None)
+            if index is None:
+                continue
+            exit_code = self._exit_code(status)
+            if self._stopping_since is not None:
+                self.logger.info(f"Worker {index} stopped, pid: {pid}")
+            elif exit_code == 0:
+                self.logger.info(f"Worker {index} finished, pid: {pid}")
+            else:
+                self.logger.error(f"Worker {index} crashed with exit code {exit_code}, pid: {pid}, restarting")
+                time.sleep(self.restart_delay)
+                if self._stopping_since is None:
+                    self._spawn(index)
+
+    @staticmethod
+    def _exit_code(status: int) -> int:
+        # os.waitstatus_to_exitcode is not available on python 3.8
+        if os.WIFEXITED(status):
+            return os.WEXITSTATUS(status)
+        if os.WIFSIGNALED(status):
+            return -os.WTERMSIG(status)
+        return status
+
+    def _forward_signal(self, signum, frame):
+        if self._stopping_since is None:
+            self._stopping_since = time.monotonic()
+        self._send_signal(signum)
+
+    def _send_signal(self, signum: int):
+        for pid in self._pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
@@ -22,6 +22,7 @@ from panini.app import get_app
 from dataclasses import dataclass, field
 from panini.middleware import Middleware
 from panini.managers.event_manager import Listen
+from panini.utils.subject_index import SubjectIndex, subject_matches
 import warnings
 
 
@@ -170,6 +171,10 @@ class TracingMiddleware(Middleware):
         self._ignored_subjects_send = tracing_config.get("custom_config", {}).get(
             "ignore_send_subjects", []
         )
+        self._ignored_subjects_listen_index = SubjectIndex()
+        for subject in self._ignored_subjects_listen:
+            self._ignored_subjects_listen_index.add(subject, subject)
+        self._subscriptions_index = SubjectIndex()
         super().__init__()
 
     def _create_uuid(self) -> str:
@@ -256,44 +261,31 @@ class TracingMiddleware(Middleware):
     @classmethod
     def wildcard_match(cls, match_key: str, subject: str) -> Optional[str]:
         """Perform a wildcard match between the match_key and the subject"""
-        split_subject = subject.split(".")
-        split_key = match_key.split(".")
-
-        # if `>` at the end of match_key
-        if split_key[-1] == ">":
-            if (
-                len(split_subject) < len(split_key) - 1
-            ):  # -1 because `>` matches remaining parts
-                return None
-            # checking parts before `>` match
-            for k, s in zip(split_key[:-1], split_subject):
-                if k != "*" and k != s:
-                    return None
-            # parts before `>` matched in both
-            return match_key
-
-        # if not `>` at the end
-        if len(split_subject) != len(split_key):
-            return None
-
-        if all(k == "*" or k == s for k, s in zip(split_key, split_subject)):
+        if subject_matches(match_key, subject):
             return match_key
-
         return None
 
+    def _match_subscriptions(self, subscriptions: dict, subject: str) -> List[str]:
+        """Subscription keys matching the subject, in order of subscription"""
+        if len(self._subscriptions_index) != len(subscriptions):
+            self._subscriptions_index = SubjectIndex()
+            for position, subscription in enumerate(subscriptions.keys()):
+                self._subscriptions_index.add(subscription, (position, subscription))
+        return [
+            subscription
+            for _, subscription in sorted(self._subscriptions_index.match(subject))
+        ]
+
     async def trace_listen_any(self, msg: Msg, callback, nats_action=None):
         context = {}
         app = get_app()
         assert app is not None
-        for subject in self._ignored_subjects_listen:
-            if self.wildcard_match(subject, msg.subject):
-                response = await callback(msg)
-                return response
-        for subject in app._event_manager.subscriptions.keys():
-            matched_subject = self.wildcard_match(subject, msg.subject)
-            if not matched_subject:
-                continue
-            listen_obj_list = app._event_manager.subscriptions[matched_subject]
+        if self._ignored_subjects_listen_index.match(msg.subject):
+            response = await callback(msg)
+            return response
+        subscriptions = app._event_manager.subscriptions
+        for subject in self._match_subscriptions(subscriptions, msg.subject):
+            listen_obj_list = subscriptions[subject]
             listen_object: Listen
             for listen_object in listen_obj_list:
                 use_tracing = listen_object._meta.get("use_tracing", True)
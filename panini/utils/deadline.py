@@ -0,0 +1,50 @@
+import contextvars
+import time
+from typing import Optional
+
+# seconds left until the requester stops waiting, relative, so hosts don't need synchronized clocks
+HEADER = "panini-timeout"
+
+# time.monotonic() deadline of the request being handled, inherited by tasks created by the handler
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("panini_deadline", default=None)
+
+
+def current() -> Optional[float]:
+    """
+    Returns the deadline (time.monotonic() clock) of the request handled by the current task,
+    None if there is no deadline
+    """
+    return _current_deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """
+    Returns seconds left until the deadline of the request handled by the current task, None if there is no deadline
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def set_current(deadline: Optional[float]):
+    _current_deadline.set(deadline)
+
+
+def from_headers(headers: Optional[dict]) -> Optional[float]:
+    """
+    Converts the timeout of a received request to a local time.monotonic() deadline
+    """
+    if not headers:
+        return None
+    value = headers.get(HEADER)
+    if value is None:
+        return None
+    try:
+        return time.monotonic() + float(value)
+    except ValueError:
+        return None
+
+
+def to_header(timeout: float) -> str:
+    return f"{timeout:.6f}"
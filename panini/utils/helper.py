@@ -6,6 +6,7 @@ import subprocess
 import sys
 import threading
 import random
+import warnings
 
 from multiprocessing import Process
 from threading import Thread
@@ -46,6 +47,26 @@ async def run_coro_threadsafe(coro, other_loop, our_loop=None, many=False):
     return fut.result()
 
 
+def set_event_loop_policy(event_loop: str) -> str:
+    """
+    Installs the event loop policy by name: "asyncio" or "uvloop".
+    Falls back to asyncio, if uvloop is not installed, returns the name of installed policy
+    """
+    assert event_loop in ("asyncio", "uvloop"), "event_loop must be one of ('asyncio', 'uvloop')"
+    if event_loop == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            warnings.warn(
+                "uvloop not found, the default asyncio event loop is used, "
+                "try to run `$ pip install panini[uvloop]`"
+            )
+            return "asyncio"
+        if not isinstance(asyncio.get_event_loop_policy(), uvloop.EventLoopPolicy):
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return event_loop
+
+
 def start_thread(method, args=None, daemon=False):
     kwargs = dict(target=method)
     if args is not None:
@@ -252,12 +252,16 @@ def _emergency_logging() -> None:
 def _dedicated_listener_process(
     log_listener_queue: Queue,
     stop_event: Event,
-    config: dict
+    config: dict,
+    parent_pid: int = None,
 ) -> None:
     logging.config.dictConfig(config)
     log_listener = logging.handlers.QueueListener(log_listener_queue, LogHandler())
     log_listener.start()
-    stop_event.wait()
+    # stop also if the parent process has been killed and can't set the stop_event
+    while not stop_event.wait(1):
+        if parent_pid is not None and os.getppid() != parent_pid:
+            break
     log_listener.stop()
 
 
@@ -271,7 +275,8 @@ def _set_log_recorder_process(config: dict) -> (Queue, Event, Process):
             args=(
                 log_listener_queue,
                 stop_event,
-                config
+                config,
+                os.getpid(),
             ),
         )
         listener_process.start()
@@ -0,0 +1,83 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+from .subject_index import subject_matches
+
+
+class ReplyCache:
+    """
+    LRU cache of encoded responses with TTL, keyed by the request subject, a hash of the raw payload bytes
+    and values of key_headers. Other headers are ignored, so requests differing only by them share a response
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = 1024, key_headers: Sequence[str] = None):
+        """
+        :param ttl: time in seconds a response is served from the cache, None - ttl is given for every response
+        :param max_size: max number of cached responses, the least recently used ones are evicted
+        :param key_headers: names of request headers that are part of the key, e.g. ["authorization"]
+        """
+        assert ttl is None or ttl > 0, "cache_ttl must be a positive number"
+        assert max_size > 0, "cache_size must be a positive number"
+        self.ttl = ttl
+        self.max_size = max_size
+        self.key_headers = tuple(key_headers or ())
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, subject: str, data: bytes, headers: dict = None) -> Tuple[str, bytes, tuple]:
+        header_values = tuple((headers or {}).get(name) for name in self.key_headers)
+        return subject, hashlib.blake2b(data, digest_size=16).digest(), header_values
+
+    def get(self, key: Tuple[str, bytes, tuple]) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Tuple[str, bytes, tuple], response: bytes, ttl: float = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str = None, data: bytes = None) -> int:
+        """
+        Removes cached responses for subjects matched by the subject pattern (all subjects if None),
+        only responses to the given raw payload (with any key_headers) if data is set.
+        Returns the number of removed responses
+        """
+        if (
+                not self.key_headers and subject is not None and data is not None
+                and "*" not in subject and ">" not in subject
+        ):
+            return 1 if self._entries.pop(self.key(subject, data), None) is not None else 0
+
+        data_hash = None if data is None else self.key("", data)[1]
+        removed = [
+            key for key in self._entries
+            if (subject is None or subject_matches(subject, key[0])) and (data_hash is None or key[1] == data_hash)
+        ]
+        for key in removed:
+            del self._entries[key]
+        return len(removed)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
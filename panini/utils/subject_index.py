@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Tuple
+
+
+class _Node:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
+
+
+class SubjectIndex:
+    """
+    Trie of NATS subject patterns with `*` and `>` wildcards support.
+    Matching cost depends on the number of subject tokens, not on the number of patterns,
+    and results for recently matched subjects are kept in an LRU cache
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self._root = _Node()
+        self._size = 0
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, pattern: str, value: Any):
+        node = self._root
+        for token in pattern.split("."):
+            node = node.children.setdefault(token, _Node())
+        node.values.append(value)
+        self._size += 1
+        self._cache.clear()
+
+    def remove(self, pattern: str, value: Any = None) -> List[Any]:
+        """
+        Removes value (all values if None) stored for the pattern, returns removed values
+        """
+        path = [self._root]
+        for token in pattern.split("."):
+            node = path[-1].children.get(token)
+            if node is None:
+                return []
+            path.append(node)
+
+        node = path[-1]
+        if value is None:
+            removed, node.values = node.values, []
+        else:
+            removed = [v for v in node.values if v is value]
+            node.values = [v for v in node.values if v is not value]
+        self._size -= len(removed)
+        self._cache.clear()
+
+        # prune empty branches
+        tokens = pattern.split(".")
+        for parent, token, child in zip(reversed(path[:-1]), reversed(tokens), reversed(path[1:])):
+            if child.children or child.values:
+                break
+            del parent.children[token]
+        return removed
+
+    def match(self, subject: str) -> Tuple[Any, ...]:
+        """
+        Returns values of all patterns that match the subject
+        """
+        try:
+            self._cache.move_to_end(subject)
+            return self._cache[subject]
+        except KeyError:
+            pass
+        result = tuple(self._match(subject))
+        if self._cache_size:
+            self._cache[subject] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _match(self, subject: str) -> List[Any]:
+        result = []
+        nodes = [self._root]
+        for token in subject.split("."):
+            next_nodes = []
+            for node in nodes:
+                tail = node.children.get(">")
+                if tail is not None:
+                    result.extend(tail.values)
+                child = node.children.get(token)
+                if child is not None:
+                    next_nodes.append(child)
+                wildcard = node.children.get("*")
+                if wildcard is not None:
+                    next_nodes.append(wildcard)
+            if not next_nodes:
+                return result
+            nodes = next_nodes
+        for node in nodes:
+            result.extend(node.values)
+        return result
+
+
+def is_wildcard_pattern(pattern: str) -> bool:
+    return any(token in ("*", ">") for token in pattern.split("."))
+
+
+@lru_cache(maxsize=4096)
+def _compile(pattern: str) -> Tuple[str, ...]:
+    return tuple(pattern.split("."))
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    """
+    Checks that the subject is matched by the pattern with `*` and `>` wildcards
+    """
+    return pattern_covers(pattern, subject)
+
+
+@lru_cache(maxsize=4096)
+def pattern_covers(pattern: str, sub_pattern: str) -> bool:
+    """
+    Checks that every subject matched by sub_pattern is also matched by pattern,
+    e.g. `orders.>` covers `orders.*.created`
+    """
+    tokens = _compile(pattern)
+    sub_tokens = _compile(sub_pattern)
+    for i, token in enumerate(tokens):
+        if token == ">":
+            return len(sub_tokens) > i
+        if i >= len(sub_tokens) or sub_tokens[i] == ">":
+            return False
+        if token != "*" and token != sub_tokens[i]:
+            return False
+    return len(tokens) == len(sub_tokens)
+
+
+class SubjectRules:
+    """
+    Options by subject pattern, the first matching pattern in the rules order is applied
+    """
+
+    def __init__(self, rules: dict = None):
+        self.rules = dict(rules or {})
+        self._build()
+
+    def _build(self):
+        self._index = SubjectIndex()
+        for order, (pattern, value) in enumerate(self.rules.items()):
+            self._index.add(pattern, (order, value))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def set(self, pattern: str, value: Any):
+        """
+        Adds a rule to the end, an existing rule gets the new value and keeps its order
+        """
+        self.rules[pattern] = value
+        self._build()
+
+    def remove(self, pattern: str) -> bool:
+        if self.rules.pop(pattern, None) is None:
+            return False
+        self._build()
+        return True
+
+    def match(self, subject: str, default: Any = None) -> Any:
+        if not self.rules:
+            return default
+        matched = self._index.match(subject)
+        if not matched:
+            return default
+        return min(matched, key=lambda item: item[0])[1]
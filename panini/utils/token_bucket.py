@@ -0,0 +1,44 @@
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket filled with rate tokens per second up to burst tokens, every operation is O(1).
+    Tokens can be reserved in advance, so waiting callers are served in the order they came
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        :param rate: tokens per second
+        :param burst: max number of tokens, max(1, rate) by default
+        """
+        assert rate > 0, "rate must be a positive number"
+        if burst is None:
+            burst = max(1, rate)
+        assert burst >= 1, "burst must be at least 1"
+        self.rate = rate
+        self.burst = burst
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens, the balance may go below zero. Returns seconds to wait until the tokens are there
+        """
+        self._refill()
+        self.tokens -= tokens
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
@@ -24,6 +24,10 @@ tracing_dependencies = [
     "opentelemetry-exporter-prometheus==1.12.0rc1"
 ]
 
+uvloop_dependencies = [
+    "uvloop>=0.17.0",
+]
+
 setup(
     name="panini",
     version="0.8.4",
@@ -83,7 +87,8 @@ setup(
         "Source": "https://github.com/lwinterface/panini/",
     },
     zip_safe=False,
-    extras_required={
-        'tracing': tracing_dependencies
+    extras_require={
+        'tracing': tracing_dependencies,
+        'uvloop': uvloop_dependencies,
     }
 )
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_app_run",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    state = {"on_start": False, "task": False}
+
+    @app.on_start_task()
+    async def on_start():
+        state["on_start"] = True
+
+    @app.task()
+    async def task():
+        state["task"] = True
+
+    @app.listen("test_app_run.state")
+    async def get_state(msg):
+        return {
+            **state,
+            "nest_asyncio_patched": asyncio.Task is asyncio.tasks._PyTask,
+        }
+
+    @app.listen("test_app_run.echo")
+    async def echo(msg):
+        return {"data": msg.data["data"] + 1}
+
+    @app.listen("test_app_run.request_sync_from_thread", executor="thread")
+    def request_sync_from_thread(msg):
+        return app.request_sync("test_app_run.echo", {"data": 1})
+
+    @app.listen("test_app_run.request_sync_from_loop")
+    async def request_sync_from_loop(msg):
+        try:
+            app.request_sync("test_app_run.echo", {"data": 1})
+        except RuntimeError:
+            return {"error": True}
+        return {"error": False}
+
+    asyncio.run(app.run())
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_run(client):
+    response = client.request("test_app_run.state", {})
+    assert response["on_start"] is True
+    assert response["task"] is True
+    assert response["nest_asyncio_patched"] is False
+
+
+def test_request_sync_from_thread(client):
+    response = client.request("test_app_run.request_sync_from_thread", {})
+    assert response["data"] == 2
+
+
+def test_request_sync_from_loop(client):
+    response = client.request("test_app_run.request_sync_from_loop", {})
+    assert response["error"] is True
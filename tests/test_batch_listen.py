@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.managers.nats_client import MsgBatch
+from panini.managers.schema_manager import SchemaManager
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_batch_listen",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+
+    batches = []
+
+    @app.listen("test_batch_listen.events", batch_size=5, batch_timeout=200)
+    async def events(batch: MsgBatch):
+        batches.append([data["id"] for data in batch.data])
+
+    @app.listen("test_batch_listen.batches")
+    async def get_batches(msg):
+        return {"batches": batches}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_batch_listen(client):
+    for i in range(12):
+        client.publish("test_batch_listen.events", {"id": i})
+    client.publish("test_batch_listen.events", b"not a json")
+
+    time.sleep(0.1)
+    response = client.request("test_batch_listen.batches", {})
+    assert response["batches"] == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+
+    time.sleep(0.3)
+    response = client.request("test_batch_listen.batches", {})
+    assert response["batches"][-1] == [10, 11]
+
+
+def test_serialize_messages():
+    messages = [b'{"a": 1}', b'{"a": 2}']
+    assert SchemaManager.serialize_messages(dict, messages) == [{"a": 1}, {"a": 2}]
+    assert SchemaManager.serialize_messages(str, messages) == ['{"a": 1}', '{"a": 2}']
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.exceptions import CircuitOpenError
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_circuit_breaker",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        breaker_rules={
+            "test_circuit_breaker.dependency": {"window": 4, "min_requests": 4, "open_timeout": 0.1},
+        },
+    )
+    dependency = {"up": False}
+    events = []
+
+    @app.listen("test_circuit_breaker.dependency")
+    async def dependency_listener(msg):
+        if not dependency["up"]:
+            await asyncio.sleep(1)
+        return {}
+
+    @app.listen("panini_events.test_circuit_breaker.*.breaker")
+    async def breaker_events(msg):
+        events.append(msg.data)
+
+    async def request():
+        try:
+            await app.request("test_circuit_breaker.dependency", {}, timeout=0.05)
+            return "ok"
+        except CircuitOpenError:
+            return "open"
+        except Exception:
+            return "error"
+
+    @app.listen("test_circuit_breaker.run")
+    async def run(msg):
+        results = [await request() for _ in range(4)]
+        started = time.monotonic()
+        results.append(await request())
+        fail_fast = time.monotonic() - started
+        dependency["up"] = True
+        await asyncio.sleep(0.15)
+        results.append(await request())
+        await asyncio.sleep(0.05)
+        return {
+            "results": results,
+            "fail_fast": fail_fast,
+            "stats": app.breaker_stats()["test_circuit_breaker.dependency"],
+            "events": [(event["previous_state"], event["state"]) for event in events],
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_open_and_recover(client):
+    response = client.request("test_circuit_breaker.run", {})
+    assert response["results"] == ["error"] * 4 + ["open", "ok"]
+    assert response["fail_fast"] < 0.05
+    assert response["stats"]["state"] == "closed"
+    assert response["stats"]["rejected"] == 1
+    assert response["events"] == [
+        ["closed", "open"],
+        ["open", "half_open"],
+        ["half_open", "closed"],
+    ]
@@ -0,0 +1,97 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+PORT = 4229
+
+pytestmark = pytest.mark.skipif(shutil.which("nats-server") is None, reason="nats-server is not installed")
+
+
+def start_nats_server() -> subprocess.Popen:
+    server = subprocess.Popen(
+        ["nats-server", "-p", str(PORT)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    time.sleep(0.3)
+    return server
+
+
+def run_panini(connection_lost_policy: str):
+    app = panini_app.App(
+        service_name="test_connection_monitor",
+        host="127.0.0.1",
+        port=PORT,
+        reconnect=True,
+        reconnecting_time_sleep=0.2,
+        logger_in_separate_process=False,
+        connection_lost_policy=connection_lost_policy,
+        rtt_interval=0.2,
+    )
+
+    @app.listen("test_connection_monitor.stats")
+    async def stats(msg):
+        return app.connection_stats()
+
+    app.start()
+
+
+@pytest.fixture
+def server():
+    server = start_nats_server()
+    yield server
+    server.kill()
+    server.wait()
+
+
+def start_client(policy: str) -> TestClient:
+    client = TestClient(
+        run_panini,
+        run_panini_kwargs={"connection_lost_policy": policy},
+        base_nats_url=f"nats://127.0.0.1:{PORT}",
+    )
+    return client.start()
+
+
+def test_reconnect_metrics(server):
+    client = start_client("reconnect")
+    try:
+        time.sleep(0.5)
+        response = client.request("test_connection_monitor.stats", {})
+        assert response["connected"] is True
+        assert response["disconnects"] == 0
+        assert response["rtt"] is not None and response["rtt"] < 1
+
+        server.kill()
+        server.wait()
+        time.sleep(0.5)
+        server = start_nats_server()
+        time.sleep(1)
+
+        # the test client itself doesn't reconnect to the restarted server
+        requester = TestClient(base_nats_url=f"nats://127.0.0.1:{PORT}").start()
+        response = requester.request("test_connection_monitor.stats", {})
+        requester.stop()
+        assert response["connected"] is True
+        assert response["disconnects"] == 1
+        assert response["reconnects"] == 1
+        assert response["last_reconnect_duration"] >= 0.5
+        assert response["outage"] is None
+    finally:
+        client.stop()
+        server.kill()
+        server.wait()
+
+
+def test_exit_policy(server):
+    client = start_client("exit")
+    try:
+        server.kill()
+        server.wait()
+        client.panini_process.join(5)
+        assert client.panini_process.exitcode == 99
+    finally:
+        client.stop()
@@ -0,0 +1,78 @@
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_connection_pool",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        connections=3,
+        connection_lanes={"test_connection_pool.ingest.>": 2},
+    )
+
+    @app.listen("test_connection_pool.ingest.data")
+    async def ingest(msg):
+        return {"subject": msg.subject}
+
+    @app.listen("test_connection_pool.control", connection=1)
+    async def control(msg):
+        return {"subject": msg.subject}
+
+    @app.listen("test_connection_pool.hashed.*")
+    async def hashed(msg):
+        return {"subject": msg.subject}
+
+    @app.listen("test_connection_pool.placement")
+    async def placement(msg):
+        clients = app.nats.connections.clients
+        return {
+            subject: [clients.index(sub._conn) for sub in subs]
+            for subject, subs in app.nats.sub_map.items()
+        }
+
+    @app.listen("test_connection_pool.publish_ingest")
+    async def publish_ingest(msg):
+        before = [connection["out_msgs"] for connection in app.connection_stats()["connections"]]
+        for _ in range(10):
+            await app.publish("test_connection_pool.ingest.data", {})
+        response = await app.request("test_connection_pool.ingest.data", {})
+        after = [connection["out_msgs"] for connection in app.connection_stats()["connections"]]
+        return {"out_msgs": [a - b for a, b in zip(after, before)], "response": response}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_subscriptions_placement(client):
+    placement = client.request("test_connection_pool.placement", {})
+    assert placement["test_connection_pool.ingest.data"] == [2]
+    assert placement["test_connection_pool.control"] == [1]
+    assert len({index[0] for index in placement.values()}) > 1
+
+
+def test_listeners_on_every_connection(client):
+    for subject in (
+        "test_connection_pool.ingest.data",
+        "test_connection_pool.control",
+        "test_connection_pool.hashed.a",
+    ):
+        assert client.request(subject, {})["subject"] == subject
+
+
+def test_publish_lane(client):
+    response = client.request("test_connection_pool.publish_ingest", {})
+    # the reply to publish_ingest itself goes through the primary connection
+    assert response["out_msgs"][1] == 0
+    assert response["out_msgs"][2] >= 11
+    assert response["response"]["subject"] == "test_connection_pool.ingest.data"
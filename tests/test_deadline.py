@@ -0,0 +1,90 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.utils import deadline
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_deadline",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    state = {"c_calls": 0, "b_remaining": None, "b_duration": None}
+
+    @app.listen("test_deadline.c", max_in_flight=1)
+    async def c(msg):
+        state["c_calls"] += 1
+        await asyncio.sleep(0.3)
+        return {}
+
+    @app.listen("test_deadline.b")
+    async def b(msg):
+        state["b_remaining"] = deadline.remaining()
+        started = time.monotonic()
+        try:
+            await app.request("test_deadline.c", {}, timeout=10)
+        finally:
+            state["b_duration"] = time.monotonic() - started
+        return {}
+
+    async def request(subject):
+        try:
+            return await app.request(subject, {}, timeout=0.1)
+        except Exception as e:
+            return type(e).__name__
+
+    @app.listen("test_deadline.chain")
+    async def chain(msg):
+        await request("test_deadline.b")
+        await asyncio.sleep(0.4)
+        return {"b_remaining": state["b_remaining"], "b_duration": state["b_duration"]}
+
+    @app.listen("test_deadline.expired")
+    async def expired(msg):
+        calls_before = state["c_calls"]
+        await asyncio.gather(*(request("test_deadline.c") for _ in range(2)))
+        await asyncio.sleep(0.7)
+        return {
+            "calls": state["c_calls"] - calls_before,
+            "expired": app.subscription_stats()["test_deadline.c"][0]["expired"],
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_nested_timeout_clamped(client):
+    response = client.request("test_deadline.chain", {})
+    assert 0 < response["b_remaining"] <= 0.1
+    # b waits for c until the deadline of the chain request, not its own 10 seconds
+    assert response["b_duration"] < 0.2
+
+
+def test_expired_dropped(client):
+    response = client.request("test_deadline.expired", {})
+    # c handles one request at a time, the second one waits for a slot longer than its 0.1s and is dropped
+    assert response["calls"] == 1
+    assert response["expired"] == 1
+
+
+def test_deadline_independent_of_wall_clock():
+    # the responder's wall clock is an hour ahead, as with clock skew or an NTP step
+    with mock.patch("time.time", return_value=time.time() + 3600):
+        received = deadline.from_headers({deadline.HEADER: deadline.to_header(0.5)})
+    assert 0.4 < received - time.monotonic() <= 0.5
+    assert deadline.from_headers({deadline.HEADER: "bad"}) is None
+    assert deadline.from_headers({}) is None
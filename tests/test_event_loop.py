@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+uvloop = pytest.importorskip("uvloop")
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_event_loop",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        event_loop="uvloop",
+    )
+
+    @app.listen("test_event_loop.loop")
+    async def loop(msg):
+        return {
+            "event_loop": app.event_loop,
+            "loop_type": type(asyncio.get_running_loop()).__module__,
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_uvloop(client):
+    response = client.request("test_event_loop.loop", {})
+    assert response["event_loop"] == "uvloop"
+    assert response["loop_type"].startswith("uvloop")
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+# a separate interpreter, the resource tracker reports leaked shared memory when it exits
+SHM_LEAK_SCRIPT = """
+import asyncio
+import os
+import time
+
+from panini.managers.executor_manager import _ProcessPool
+
+
+def callback(msg):
+    if msg["fail"]:
+        os._exit(1)
+    time.sleep(msg["sleep"])
+    return {"data": msg["data"]}
+
+
+async def main():
+    pool = _ProcessPool(callback, 1, shm_threshold=1)
+    message = {"data": "x" * 1000, "sleep": 0, "fail": False}
+    assert (await pool.run(message))["data"] == message["data"]
+    # the first call is running when cancelled, the others are still queued
+    tasks = [asyncio.ensure_future(pool.run({**message, "sleep": 0.3})) for _ in range(4)]
+    await asyncio.sleep(0.1)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0.5)
+    # the worker dies before the response is sent
+    try:
+        await pool.run({**message, "fail": True})
+    except Exception:
+        pass
+    pool.shutdown()
+
+
+before = set(os.listdir("/dev/shm"))
+asyncio.run(main())
+print(sorted(name for name in set(os.listdir("/dev/shm")) - before if name.startswith("psm_")))
+"""
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_executor",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        thread_pool_size=1,
+        process_shm_threshold=64 * 1024,
+    )
+
+    @app.listen("test_executor.blocking", executor="thread")
+    def blocking(msg):
+        time.sleep(0.3)
+
+    @app.listen("test_executor.blocking_request", executor="thread")
+    def blocking_request(msg):
+        time.sleep(0.05)
+        return {"data": msg.data["data"] + 1}
+
+    @app.listen("test_executor.cpu_bound", executor="process", pool_size=2)
+    def cpu_bound(msg):
+        return {"pid": os.getpid(), "size": len(msg.data["payload"]), "payload": msg.data["payload"]}
+
+    @app.listen("test_executor.stats")
+    async def stats(msg):
+        return app.executor_stats()
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start(is_daemon=False)
+    yield client
+    client.stop()
+
+
+def test_thread_executor_reply(client):
+    response = client.request("test_executor.blocking_request", {"data": 1})
+    assert response["data"] == 2
+
+
+def test_thread_executor_does_not_block_loop(client):
+    for _ in range(3):
+        client.publish("test_executor.blocking", {})
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    response = client.request("test_executor.stats", {})
+    assert time.monotonic() - started < 0.2
+    assert response["thread"]["size"] == 1
+    assert response["thread"]["active"] == 1
+    assert response["thread"]["queue_depth"] == 2
+
+    time.sleep(1)
+    response = client.request("test_executor.stats", {})
+    assert response["thread"]["active"] == 0
+    assert response["thread"]["queue_depth"] == 0
+
+
+def test_process_executor(client):
+    response = client.request("test_executor.cpu_bound", {"payload": "x"})
+    assert response["payload"] == "x"
+    assert response["pid"] != client.panini_process.pid
+
+    # a large payload and response are passed through shared memory
+    response = client.request("test_executor.cpu_bound", {"payload": "x" * 256 * 1024})
+    assert response["size"] == 256 * 1024
+    assert response["pid"] != client.panini_process.pid
+
+    response = client.request("test_executor.stats", {})
+    assert response["process"]["size"] == 2
+    assert response["process"]["queue_depth"] == 0
+
+
+def test_process_executor_frees_shared_memory():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", SHM_LEAK_SCRIPT],
+        cwd=root,
+        env={**os.environ, "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 0, result.stderr
+    # blocks of loaded, cancelled and failed calls are unlinked once, without the resource tracker
+    assert result.stdout.strip() == "[]"
+    assert "leaked" not in result.stderr
+    assert "FileNotFoundError" not in result.stderr
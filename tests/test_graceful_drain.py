@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini(drain_timeout: float, http_port: int = None):
+    app = panini_app.App(
+        service_name="test_graceful_drain",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        drain_timeout=drain_timeout,
+    )
+    if http_port:
+        app.setup_web_server(port=http_port)
+
+    @app.listen("test_graceful_drain.slow")
+    async def slow(msg):
+        await app.publish("test_graceful_drain.started", {})
+        await asyncio.sleep(msg.data["sleep"])
+        return {"data": "done"}
+
+    @app.listen("test_graceful_drain.stop")
+    async def stop(msg):
+        asyncio.ensure_future(app.stop())
+
+    app.start()
+
+
+def start_client(drain_timeout: float, received: list, http_port: int = None) -> TestClient:
+    client = TestClient(
+        run_panini, run_panini_kwargs={"drain_timeout": drain_timeout, "http_port": http_port}
+    )
+    client.subscribe("test_graceful_drain.started", lambda msg: received.append(msg.subject))
+    client.subscribe("test_graceful_drain.reply", lambda msg: received.append(msg.payload))
+    return client.start(do_always_listen=False)
+
+
+def test_sigterm_waits_for_in_flight_handlers():
+    received = []
+    client = start_client(5, received)
+    try:
+        client.publish("test_graceful_drain.slow", {"sleep": 0.5}, reply="test_graceful_drain.reply")
+        client.wait(1)
+        assert received == ["test_graceful_drain.started"]
+
+        os.kill(client.panini_process.pid, signal.SIGTERM)
+        client.wait(1)
+        assert json.loads(received[1]) == {"data": "done"}
+
+        client.panini_process.join(5)
+        assert client.panini_process.exitcode == 0
+    finally:
+        client.stop()
+
+
+def test_drain_timeout_cancels_handlers():
+    received = []
+    client = start_client(0.5, received)
+    try:
+        client.publish("test_graceful_drain.slow", {"sleep": 30}, reply="test_graceful_drain.reply")
+        client.wait(1)
+
+        started = time.monotonic()
+        os.kill(client.panini_process.pid, signal.SIGTERM)
+        client.panini_process.join(5)
+        assert client.panini_process.exitcode == 0
+        assert time.monotonic() - started < 3
+        assert received == ["test_graceful_drain.started"]
+    finally:
+        client.stop()
+
+
+def test_stop_with_http_server():
+    received = []
+    client = start_client(5, received, http_port=8093)
+    try:
+        client.publish("test_graceful_drain.slow", {"sleep": 0.5}, reply="test_graceful_drain.reply")
+        client.wait(1)
+
+        client.publish("test_graceful_drain.stop", {})
+        client.wait(1)
+        assert json.loads(received[1]) == {"data": "done"}
+
+        client.panini_process.join(5)
+        assert client.panini_process.exitcode == 0
+        with pytest.raises(ConnectionError):
+            socket.create_connection(("127.0.0.1", 8093), timeout=1)
+    finally:
+        client.stop()
+
+
+@pytest.mark.parametrize("mode", ["start", "run"])
+def test_app_in_non_main_thread(mode):
+    started = threading.Event()
+    errors = []
+    app = {}
+
+    def target():
+        try:
+            app["app"] = panini_app.App(
+                service_name="test_graceful_drain_thread",
+                host="127.0.0.1",
+                port=4222,
+                logger_in_separate_process=False,
+            )
+
+            @app["app"].listen("test_graceful_drain_thread.echo")
+            async def echo(msg):
+                return msg.data
+
+            @app["app"].task()
+            async def ready():
+                started.set()
+
+            if mode == "start":
+                app["app"].start()
+            else:
+                asyncio.run(app["app"].run())
+        except Exception as e:
+            errors.append(e)
+            started.set()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    assert errors == []
+
+    # no SIGTERM handler outside the main thread, the host stops the app
+    assert app["app"].sync_client().request("test_graceful_drain_thread.echo", {"data": 1}) == {"data": 1}
+    asyncio.run_coroutine_threadsafe(app["app"].stop(), app["app"].loop).result(5)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert errors == []
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_max_in_flight",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        max_in_flight=3,
+    )
+
+    state = {"in_flight": 0, "peak": 0, "handled": 0}
+
+    @app.listen("test_max_in_flight.slow", max_in_flight=2)
+    async def slow(msg):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.1)
+        state["in_flight"] -= 1
+        state["handled"] += 1
+
+    @app.listen("test_max_in_flight.stats")
+    async def stats(msg):
+        return {
+            "peak": state["peak"],
+            "handled": state["handled"],
+            "subscriptions": app.subscription_stats(),
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_max_in_flight(client):
+    for _ in range(10):
+        client.publish("test_max_in_flight.slow", {})
+
+    time.sleep(0.15)
+    response = client.request("test_max_in_flight.stats", {})
+    slow_stats = response["subscriptions"]["test_max_in_flight.slow"][0]
+    assert slow_stats["max_in_flight"] == 2
+    assert slow_stats["in_flight"] <= 2
+    assert slow_stats["pending_msgs"] > 0
+
+    time.sleep(0.6)
+    response = client.request("test_max_in_flight.stats", {})
+    assert response["peak"] == 2
+    assert response["handled"] == 10
+    assert response["subscriptions"]["test_max_in_flight.stats"][0]["max_in_flight"] == 3
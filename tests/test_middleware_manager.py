@@ -356,3 +356,56 @@ def test_wrap_function_by_middleware_inc_dec(app):
     temp_message = Bar()
     loop.run_until_complete(wrapped_function(temp_message))
     assert temp_message.data == -5
+
+
+class InheritedDecMiddleware(DecMiddleware):
+    pass
+
+
+def test_inherited_hooks(app):
+    app.add_middleware(InheritedDecMiddleware)
+    middleware_dict = app.nats.middlewares
+    assert len(middleware_dict["send_publish_middleware"]) == 0
+    assert len(middleware_dict["send_request_middleware"]) == 0
+    assert len(middleware_dict["listen_publish_middleware"]) == 1
+    assert len(middleware_dict["listen_request_middleware"]) == 1
+
+
+def test_compile_chain_skips_unused_hooks(app):
+    async def foo(subject, message, **kwargs):
+        pass
+
+    async def bar(msg):
+        pass
+
+    app.add_middleware(FooMiddleware)
+    manager = app.nats.middleware_manager
+    assert manager.compile_chain(foo, "send_request_middleware") is foo
+    assert manager.compile_chain(foo, "send_publish_middleware") is not foo
+
+    app.nats.middlewares["listen_request_middleware"] = []
+    publish_chain, request_chain = manager.compile_listen_chains(bar)
+    assert publish_chain is not bar
+    assert request_chain is bar
+
+
+def test_compile_listen_chains_by_direction(app):
+    class Msg:
+        data = 5
+        reply = ""
+
+    async def bar(msg):
+        msg.data -= 2
+
+    app.add_middleware(IncMiddleware)
+    app.nats.middlewares["listen_publish_middleware"].append(DecMiddleware().listen_any)
+    app.nats.middlewares["listen_publish_middleware"].append(DecMiddleware().listen_any)
+
+    publish_chain, request_chain = app.nats.middleware_manager.compile_listen_chains(bar)
+    assert asyncio.iscoroutinefunction(publish_chain)
+    assert request_chain is bar
+
+    loop = asyncio.get_event_loop()
+    temp_message = Msg()
+    loop.run_until_complete(publish_chain(temp_message))
+    assert temp_message.data == -5
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.managers.priority_scheduler import PriorityScheduler
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_priority_lanes",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        priority_concurrency=1,
+        priority_max_wait=5,
+    )
+
+    @app.listen("test_priority_lanes.bulk", priority="low")
+    async def bulk(msg):
+        await asyncio.sleep(0.05)
+
+    @app.listen("test_priority_lanes.health", priority="high")
+    async def health(msg):
+        return {"stats": app.priority_stats()}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_high_priority_before_queued_bulk(client):
+    for _ in range(20):
+        client.publish("test_priority_lanes.bulk", {})
+    started = time.monotonic()
+    stats = client.request("test_priority_lanes.health", {})["stats"]
+    # 20 bulk handlers take 1s with a single slot
+    assert time.monotonic() - started < 0.5
+    assert stats["lanes"]["low"]["queued"] > 10
+    assert stats["lanes"]["high"]["dispatched"] == 1
+    assert stats["lanes"]["high"]["max_wait"] < 0.2
+
+
+def test_starvation_protection():
+    async def run():
+        scheduler = PriorityScheduler(1, max_wait=0.05)
+        order = []
+
+        async def handler(name):
+            order.append(name)
+            await asyncio.sleep(0.02)
+
+        tasks = [asyncio.ensure_future(scheduler.run(scheduler.lane("high"), handler("high")))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(scheduler.run(scheduler.lane("low"), handler("low"))))
+        tasks.extend(
+            asyncio.ensure_future(scheduler.run(scheduler.lane("high"), handler("high"))) for _ in range(10)
+        )
+        await asyncio.gather(*tasks)
+        return order, scheduler.stats()
+
+    # a private loop, asyncio.run() would reset the event loop of the main thread used by other tests
+    loop = asyncio.new_event_loop()
+    try:
+        order, stats = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    # the low priority handler is dispatched after waiting max_wait, not after all high priority ones
+    assert order.index("low") < len(order) - 1
+    assert stats["lanes"]["low"]["aged"] == 1
+    assert stats["running"] == 0
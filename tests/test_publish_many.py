@@ -0,0 +1,92 @@
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.middleware import Middleware
+from .helper import Global
+
+
+class CountSendMiddleware(Middleware):
+    calls = []
+
+    async def send_publish(self, subject: str, message, publish_func, *args, **kwargs):
+        self.calls.append(subject)
+        return await publish_func(subject, message, *args, **kwargs)
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_publish_many",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    app.add_middleware(CountSendMiddleware)
+
+    @app.listen("test_publish_many.start")
+    async def start(msg):
+        # nothing to send, middlewares are not called
+        await app.publish_many([])
+        try:
+            await app.publish_many([("test_publish_many.foo", {"data": -1})], batch_size=0)
+            rejected = False
+        except AssertionError:
+            rejected = True
+
+        await app.publish_many(
+            [("test_publish_many.foo", {"data": i}) for i in range(10)]
+            + [("test_publish_many.bar", {"data": 10}, {"header": "value"})]
+        )
+
+        async def items():
+            for i in range(11, 16):
+                yield "test_publish_many.foo", {"data": i}
+
+        await app.publish_many(items(), batch_size=2)
+        await app.publish(
+            "test_publish_many.middleware_calls",
+            {"calls": CountSendMiddleware.calls, "rejected": rejected},
+        )
+
+    app.start()
+
+
+global_object = Global()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+
+    @client.listen("test_publish_many.foo")
+    def foo_listener(msg):
+        global_object.list_variable.append(msg.data["data"])
+
+    @client.listen("test_publish_many.bar")
+    def bar_listener(msg):
+        global_object.list_variable.append(msg.data["data"])
+
+    @client.listen("test_publish_many.middleware_calls")
+    def middleware_calls_listener(msg):
+        global_object.public_variable = msg.data["calls"]
+        global_object.another_variable = msg.data["rejected"]
+
+    client.start(do_always_listen=False)
+    yield client
+    client.stop()
+
+
+def test_publish_many(client):
+    client.publish("test_publish_many.start", {})
+    client.wait(17)
+    assert sorted(global_object.list_variable) == list(range(16))
+    # one call for the list, three for the async iterator and one for the app.publish
+    assert global_object.public_variable == [
+        ">",
+        "test_publish_many.foo",
+        "test_publish_many.foo",
+        "test_publish_many.foo",
+        "test_publish_many.middleware_calls",
+    ]
+    # empty input returns without a batch, batch_size=0 is rejected
+    assert global_object.another_variable is True
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.managers.publish_pipeline import PublishPipeline
+from .helper import Global
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_publish_pipeline",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        publish_pipeline=True,
+        publish_buffer_size=1024,
+        publish_flush_interval=0.005,
+    )
+
+    @app.listen("test_publish_pipeline.start")
+    async def start(msg):
+        for i in range(100):
+            await app.publish(subject="test_publish_pipeline.bar", message={"data": i})
+        await app.publish(
+            subject="test_publish_pipeline.bar", message={"data": 100}, force=True
+        )
+
+    app.start()
+
+
+global_object = Global()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+
+    @client.listen("test_publish_pipeline.bar")
+    def bar_listener(msg):
+        global_object.list_variable.append(msg.data["data"])
+
+    client.start(do_always_listen=False)
+    yield client
+    client.stop()
+
+
+def test_publish_pipeline(client):
+    client.publish("test_publish_pipeline.start", {})
+    client.wait(101)
+    assert global_object.list_variable == list(range(101))
+
+
+class YieldingClient:
+    """
+    Yields to the loop on some publishes, like nats-py when its pending buffer is full
+    """
+
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, subject, payload, reply, headers):
+        self.published.append(payload)
+        if len(self.published) % 3 == 0:
+            await asyncio.sleep(0)
+
+    async def flush(self):
+        await asyncio.sleep(0)
+
+
+def test_order_with_concurrent_writes():
+    async def run():
+        client = YieldingClient()
+        pipeline = PublishPipeline(client, buffer_size=16, flush_interval=0)
+
+        async def producer(index):
+            for i in range(50):
+                await pipeline.publish("subject", f"{index}.{i}".encode(), force=i % 7 == 0)
+                if i % 5 == 0:
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(*(producer(index) for index in range(8)))
+        await pipeline.flush()
+        return client.published
+
+    # a private loop, asyncio.run() would reset the event loop of the main thread used by other tests
+    loop = asyncio.new_event_loop()
+    try:
+        published = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert len(published) == 400
+    for index in range(8):
+        sent = [int(payload.split(b".")[1]) for payload in published if payload.startswith(f"{index}.".encode())]
+        assert sent == list(range(50))
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from panini.exceptions import RateLimitExceededError
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.utils.token_bucket import TokenBucket
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_rate_limit",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    app.set_rate_limit("test_rate_limit.wait.>", rate=20, burst=5)
+    app.set_rate_limit("test_rate_limit.drop", rate=1, burst=5, overflow="drop")
+    app.set_rate_limit("test_rate_limit.raise", rate=1, burst=2, overflow="raise")
+
+    @app.listen("test_rate_limit.raise")
+    async def echo(msg):
+        return {}
+
+    @app.listen("test_rate_limit.wait_publishes")
+    async def wait_publishes(msg):
+        started = time.monotonic()
+        for i in range(15):
+            await app.publish(f"test_rate_limit.wait.{i}", {})
+        return {"duration": time.monotonic() - started, "stats": app.rate_limit_stats()}
+
+    @app.listen("test_rate_limit.drop_publishes")
+    async def drop_publishes(msg):
+        await app.publish_many([("test_rate_limit.drop", {})] * 10)
+        return {"stats": app.rate_limit_stats()}
+
+    @app.listen("test_rate_limit.raise_requests")
+    async def raise_requests(msg):
+        responses = 0
+        try:
+            for _ in range(5):
+                await app.request("test_rate_limit.raise", {})
+                responses += 1
+        except RateLimitExceededError:
+            pass
+        return {"responses": responses, "stats": app.rate_limit_stats()}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_wait(client):
+    response = client.request("test_rate_limit.wait_publishes", {})
+    # 5 messages of the burst at once, 10 more at 20 per second
+    assert 0.4 < response["duration"] < 1
+    stats = response["stats"]["test_rate_limit.wait.>"]
+    assert stats["allowed"] == 15
+    assert stats["delayed"] == 10
+
+
+def test_drop(client):
+    stats = client.request("test_rate_limit.drop_publishes", {})["stats"]["test_rate_limit.drop"]
+    assert stats["allowed"] == 5
+    assert stats["dropped"] == 5
+
+
+def test_raise(client):
+    response = client.request("test_rate_limit.raise_requests", {})
+    assert response["responses"] == 2
+    assert response["stats"]["test_rate_limit.raise"]["rejected"] == 1
+
+
+def test_fractional_rate_bucket():
+    bucket = TokenBucket(0.5)
+    # burst defaults to a single message, not to the fractional rate
+    assert bucket.burst == 1
+    assert bucket.try_take()
+    assert not bucket.try_take()
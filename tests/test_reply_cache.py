@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.utils.reply_cache import ReplyCache
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_reply_cache",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    calls = {"count": 0}
+
+    @app.listen("test_reply_cache.lookup.*", cache_ttl=0.5, cache_size=2)
+    async def lookup(msg):
+        calls["count"] += 1
+        return {"data": msg.data["data"], "calls": calls["count"]}
+
+    @app.listen("test_reply_cache.user", cache_ttl=10, cache_key_headers=["authorization"])
+    async def user(msg):
+        calls["count"] += 1
+        return {"user": msg.headers.get("authorization"), "calls": calls["count"]}
+
+    @app.listen("test_reply_cache.as_users")
+    async def as_users(msg):
+        return {
+            "responses": [
+                await app.request("test_reply_cache.user", {}, headers=headers) for headers in msg.data["headers"]
+            ]
+        }
+
+    @app.listen("test_reply_cache.stats")
+    async def stats(msg):
+        return app.cache_stats()
+
+    @app.listen("test_reply_cache.invalidate")
+    async def invalidate(msg):
+        return {"removed": app.invalidate_cache(msg.data.get("subject"))}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_cache_hit(client):
+    client.request("test_reply_cache.invalidate", {})
+    first = client.request("test_reply_cache.lookup.a", {"data": 1})
+    second = client.request("test_reply_cache.lookup.a", {"data": 1})
+    assert second == first
+
+    # other payload or subject is a miss
+    assert client.request("test_reply_cache.lookup.a", {"data": 2})["calls"] == first["calls"] + 1
+    assert client.request("test_reply_cache.lookup.b", {"data": 1})["calls"] == first["calls"] + 2
+
+    stats = client.request("test_reply_cache.stats", {})["test_reply_cache.lookup.*"][0]
+    assert stats["hits"] >= 1
+    assert stats["size"] == 2
+
+
+def test_cache_ttl(client):
+    first = client.request("test_reply_cache.lookup.c", {"data": 1})
+    time.sleep(0.6)
+    assert client.request("test_reply_cache.lookup.c", {"data": 1})["calls"] > first["calls"]
+
+
+def test_invalidate(client):
+    first = client.request("test_reply_cache.lookup.d", {"data": 1})
+    assert client.request("test_reply_cache.invalidate", {"subject": "test_reply_cache.lookup.d"})["removed"] == 1
+    assert client.request("test_reply_cache.lookup.d", {"data": 1})["calls"] > first["calls"]
+
+
+def test_key_headers(client):
+    alice, alice_again, bob = client.request("test_reply_cache.as_users", {"headers": [
+        {"authorization": "alice", "trace": "1"},
+        {"authorization": "alice", "trace": "2"},
+        {"authorization": "bob"},
+    ]})["responses"]
+    assert alice_again == alice
+    # another caller doesn't get the response cached for alice
+    assert bob["user"] == "bob"
+    assert bob["calls"] > alice["calls"]
+
+
+def test_lru_eviction():
+    cache = ReplyCache(ttl=10, max_size=2)
+    keys = [cache.key("subject", bytes([i])) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.set(key, bytes([i]))
+    assert cache.get(keys[0]) == b"\x00"
+    cache.set(keys[2], b"\x02")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == b"\x00"
+    assert cache.invalidate("subject", b"\x02") == 1
+    assert cache.stats()["size"] == 1
+
+
+def test_invalidate_with_key_headers():
+    cache = ReplyCache(ttl=10, key_headers=["authorization"])
+    cache.set(cache.key("subject", b"1", {"authorization": "alice"}), b"alice")
+    cache.set(cache.key("subject", b"1", {"authorization": "bob"}), b"bob")
+    assert cache.get(cache.key("subject", b"1")) is None
+    assert cache.invalidate("subject", b"1") == 2
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_request_cache",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        request_cache_rules={
+            "test_request_cache.slow.cached": {"cache_ttl": 10},
+            "test_request_cache.slow.*": {"coalesce": True},
+        },
+    )
+    calls = {"count": 0}
+
+    @app.listen("test_request_cache.slow.*")
+    async def slow(msg):
+        calls["count"] += 1
+        await asyncio.sleep(0.2)
+        return {"data": msg.data["data"]}
+
+    @app.listen("test_request_cache.run")
+    async def run(msg):
+        before = calls["count"]
+        stats_before = app.request_cache_stats()
+        responses = await asyncio.gather(*(
+            app.request(msg.data["subject"], {"data": i % 2}, **msg.data.get("kwargs", {}))
+            for i in range(10)
+        ))
+        # every caller gets its own copy of the response
+        responses[0]["data"] = "changed"
+        stats = app.request_cache_stats()
+        return {
+            "responses": [response["data"] for response in responses],
+            "calls": calls["count"] - before,
+            "saved": stats["saved"] - stats_before["saved"],
+        }
+
+    @app.listen("test_request_cache.timeouts")
+    async def timeouts(msg):
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+
+        async def request(timeout):
+            try:
+                await app.request("test_request_cache.slow.timeouts", {"data": 1}, timeout=timeout)
+                result = "ok"
+            except Exception as e:
+                result = type(e).__name__
+            return result, loop.time() - started
+
+        starter = asyncio.ensure_future(request(msg.data["starter_timeout"]))
+        await asyncio.sleep(0.01)
+        joiner = await request(msg.data["joiner_timeout"])
+        return {"starter": await starter, "joiner": joiner}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_coalesce_by_rule(client):
+    response = client.request("test_request_cache.run", {"subject": "test_request_cache.slow.a"})
+    assert response["responses"] == ["changed"] + [i % 2 for i in range(1, 10)]
+    assert response["calls"] == 2
+    assert response["saved"] == 8
+
+
+def test_coalesce_disabled_per_call(client):
+    response = client.request(
+        "test_request_cache.run", {"subject": "test_request_cache.slow.a", "kwargs": {"coalesce": False}}
+    )
+    assert response["calls"] == 10
+    assert response["saved"] == 0
+
+
+def test_cache_by_rule(client):
+    response = client.request("test_request_cache.run", {"subject": "test_request_cache.slow.cached"})
+    # not coalesced, all requests are sent before the first response is cached
+    assert response["calls"] == 10
+
+    response = client.request("test_request_cache.run", {"subject": "test_request_cache.slow.cached"})
+    assert response["calls"] == 0
+    assert response["saved"] == 10
+    assert response["responses"] == ["changed"] + [i % 2 for i in range(1, 10)]
+
+
+def test_cache_and_coalesce_per_call(client):
+    kwargs = {"coalesce": True, "cache_ttl": 10}
+    response = client.request("test_request_cache.run", {"subject": "test_request_cache.slow.b", "kwargs": kwargs})
+    assert response["calls"] == 2
+    response = client.request("test_request_cache.run", {"subject": "test_request_cache.slow.b", "kwargs": kwargs})
+    assert response["calls"] == 0
+
+
+def test_coalesced_callers_keep_own_timeouts(client):
+    # the joined round trip times out after 0.1s, the joiner sends a new one within its own timeout
+    response = client.request("test_request_cache.timeouts", {"starter_timeout": 0.1, "joiner_timeout": 1})
+    assert response["starter"][0] in ("TimeoutError", "NATSTimeoutError")
+    assert response["joiner"][0] == "ok"
+
+    # the joiner doesn't wait for the longer round trip it joined
+    response = client.request("test_request_cache.timeouts", {"starter_timeout": 1, "joiner_timeout": 0.1})
+    assert response["joiner"][0] == "NATSTimeoutError"
+    assert response["joiner"][1] < 0.2
+    assert response["starter"][0] == "ok"
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.managers.request_hedger import RequestHedger
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_request_hedging",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        hedge_rules={"test_request_hedging.auto": "auto"},
+        hedge_budget=0.5,
+    )
+    calls = {"alternating": 0, "auto": 0}
+
+    @app.listen("test_request_hedging.alternating")
+    async def alternating(msg):
+        # odd calls are slow, as if they landed on a slow replica
+        calls["alternating"] += 1
+        await asyncio.sleep(1 if calls["alternating"] % 2 else 0)
+        return {"call": calls["alternating"]}
+
+    @app.listen("test_request_hedging.auto")
+    async def auto(msg):
+        calls["auto"] += 1
+        await asyncio.sleep(1 if calls["auto"] == msg.data["slow_call"] else 0.01)
+        return {"call": calls["auto"]}
+
+    @app.listen("test_request_hedging.run")
+    async def run(msg):
+        # counters of this run only, the hedger is shared by all tests of the module
+        before = app.hedge_stats()
+        started = time.monotonic()
+        responses = []
+        for _ in range(msg.data.get("count", 1)):
+            responses.append(await app.request(
+                msg.data["subject"], msg.data.get("message", {}), **msg.data.get("kwargs", {})
+            ))
+        stats = app.hedge_stats()
+        for key in ("requests", "hedged", "wins"):
+            stats[key] -= before[key]
+        return {
+            "responses": responses,
+            "duration": time.monotonic() - started,
+            "stats": stats,
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_hedge_wins(client):
+    response = client.request(
+        "test_request_hedging.run",
+        {"subject": "test_request_hedging.alternating", "kwargs": {"hedge_delay": 0.05}},
+    )
+    assert response["duration"] < 0.5
+    assert response["responses"][0]["call"] == 2
+    assert response["stats"]["hedged"] == 1
+    assert response["stats"]["wins"] == 1
+
+
+def test_hedge_budget():
+    async def run():
+        hedger = RequestHedger(budget=0.5, max_tokens=2)
+
+        async def send(timeout):
+            # the original request gets the whole timeout and is slow, the hedge replies at once
+            if timeout == 5:
+                await asyncio.sleep(0.05)
+            return {}
+
+        hedges = []
+        for _ in range(10):
+            hedged = hedger.hedged
+            await hedger.request("subject", send, 0.01, timeout=5)
+            hedges.append(hedger.hedged - hedged)
+        return hedges, hedger.stats()
+
+    # a private loop, asyncio.run() would reset the event loop of the main thread used by other tests
+    loop = asyncio.new_event_loop()
+    try:
+        hedges, stats = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    # the full balance of 2 tokens allows 3 hedges in a row, then every request adds half a token
+    assert hedges == [1, 1, 1, 0, 1, 0, 1, 0, 1, 0]
+    assert stats["hedged"] == 6
+    assert stats["wins"] == 6
+    assert stats["budget_tokens"] == 0.5
+
+
+def test_auto_delay(client):
+    response = client.request(
+        "test_request_hedging.run",
+        {"subject": "test_request_hedging.auto", "count": 40, "message": {"slow_call": 33}},
+    )
+    assert response["duration"] < 1
+    assert response["stats"]["delays"]["test_request_hedging.auto"] < 0.1
+    # the slow call was hedged and its response lost the race
+    assert 33 not in [r["call"] for r in response["responses"]]
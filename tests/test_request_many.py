@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_request_many",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+
+    @app.listen("test_request_many.fast")
+    async def fast(msg):
+        return {"fast": msg.data["data"]}
+
+    @app.listen("test_request_many.slow")
+    async def slow(msg):
+        await asyncio.sleep(0.3)
+        return {"slow": msg.data.get("data")}
+
+    @app.listen("test_request_many.gather")
+    async def gather(msg):
+        results = await app.request_many(
+            [
+                "test_request_many.fast",
+                ("test_request_many.slow", {"data": 2}),
+                "test_request_many.not_existing",
+            ],
+            message={"data": 1},
+            timeout=1,
+            max_concurrency=2,
+        )
+        return {
+            "responses": {r.subject: r.response for r in results if r.success},
+            "errors": [r.subject for r in results if not r.success],
+            "order": [r.subject for r in results],
+        }
+
+    @app.listen("test_request_many.first")
+    async def first(msg):
+        start = time.time()
+        results = [
+            result
+            async for result in app.request_many_iter(
+                ["test_request_many.slow", "test_request_many.fast"],
+                message={"data": 1},
+                timeout=1,
+                min_responses=1,
+            )
+        ]
+        return {
+            "subjects": [r.subject for r in results],
+            "duration": time.time() - start,
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_request_many(client):
+    response = client.request("test_request_many.gather", {})
+    assert response["responses"] == {
+        "test_request_many.fast": {"fast": 1},
+        "test_request_many.slow": {"slow": 2},
+    }
+    assert response["errors"] == ["test_request_many.not_existing"]
+    assert response["order"][-1] == "test_request_many.slow"
+
+
+def test_request_many_first_wins(client):
+    response = client.request("test_request_many.first", {})
+    assert response["subjects"] == ["test_request_many.fast"]
+    assert response["duration"] < 0.3
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    registry = CollectorRegistry()
+    app = panini_app.App(
+        service_name="test_stats_sampler",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        pending_bytes_limit=2048,
+        stats_interval=0.2,
+        stats_registry=registry,
+    )
+
+    @app.listen("test_stats_sampler.slow", max_in_flight=1)
+    async def slow(msg):
+        await asyncio.sleep(0.2)
+
+    @app.listen("test_stats_sampler.sample")
+    async def sample(msg):
+        labels = {
+            "app_name": app.service_name,
+            "client_nats_name": app.client_nats_name,
+            "subject": "test_stats_sampler.slow",
+        }
+        return {
+            "sample": app.stats_sampler.sample()["test_stats_sampler.slow"],
+            "dropped_gauge": registry.get_sample_value("panini_subscription_dropped", labels),
+        }
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini, panini_service_name="test_stats_sampler")
+    client.start(do_always_listen=False)
+    yield client
+    client.stop()
+
+
+def test_stats_published(client):
+    received = []
+    client.subscribe(
+        "panini_events.test_stats_sampler.*.stats", lambda msg: received.append(json.loads(msg.payload))
+    )
+    client.wait(1)
+    assert received[0]["fields"] == [
+        "pending_msgs", "pending_bytes", "pending_bytes_limit", "delivered", "dropped"
+    ]
+    assert received[0]["subscriptions"]["test_stats_sampler.slow"][2] == 2048
+
+
+def test_slow_consumer_drops(client):
+    for i in range(20):
+        client.publish("test_stats_sampler.slow", {"data": "x" * 200})
+    time.sleep(0.5)
+
+    response = client.request("test_stats_sampler.sample", {})
+    pending_msgs, pending_bytes, pending_bytes_limit, delivered, dropped = response["sample"]
+    assert dropped > 0
+    # delivered by the server, dropped messages included
+    assert delivered == 20
+    assert 0 < pending_bytes < pending_bytes_limit
+    assert pending_msgs > 0
+
+    # gauges are set on the next sample
+    time.sleep(0.3)
+    response = client.request("test_stats_sampler.sample", {})
+    assert response["dropped_gauge"] == response["sample"][4]
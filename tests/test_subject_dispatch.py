@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_subject_dispatch",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+        dispatch_subjects=["test_subject_dispatch.>"],
+    )
+
+    @app.listen("test_subject_dispatch.foo")
+    async def foo(msg):
+        return {"listener": "foo", "data": msg.data["data"]}
+
+    @app.listen("test_subject_dispatch.*.bar")
+    async def any_bar(msg):
+        return {"listener": "any_bar", "subject": msg.subject}
+
+    @app.listen("test_subject_dispatch.baz.>")
+    async def baz_tail(msg):
+        return {"listener": "baz_tail", "subject": msg.subject}
+
+    @app.listen("test_subject_dispatch.slow", max_in_flight=1)
+    async def slow(msg):
+        await asyncio.sleep(0.2)
+
+    @app.listen("test_subject_dispatch_stats")
+    async def stats(msg):
+        return {"subjects": list(app.subscription_stats().keys())}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_dispatch(client):
+    response = client.request("test_subject_dispatch.foo", {"data": 1})
+    assert response == {"listener": "foo", "data": 1}
+
+    response = client.request("test_subject_dispatch.qux.bar", {})
+    assert response == {"listener": "any_bar", "subject": "test_subject_dispatch.qux.bar"}
+
+    response = client.request("test_subject_dispatch.baz.1.2", {})
+    assert response == {"listener": "baz_tail", "subject": "test_subject_dispatch.baz.1.2"}
+
+
+def test_dispatch_subscriptions(client):
+    response = client.request("test_subject_dispatch_stats", {})
+    assert sorted(response["subjects"]) == [
+        "test_subject_dispatch.>",
+        "test_subject_dispatch_stats",
+    ]
+
+
+def test_busy_listener_does_not_block_others(client):
+    for _ in range(5):
+        client.publish("test_subject_dispatch.slow", {})
+    started = time.monotonic()
+    response = client.request("test_subject_dispatch.foo", {"data": 2})
+    assert response == {"listener": "foo", "data": 2}
+    # slow messages wait in the backlog of their listener, not in the shared subscription (1s)
+    assert time.monotonic() - started < 0.2
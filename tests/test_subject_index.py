@@ -0,0 +1,62 @@
+from panini.utils.subject_index import SubjectIndex, pattern_covers, subject_matches
+
+
+def test_subject_index_match():
+    index = SubjectIndex()
+    index.add("foo.bar", 1)
+    index.add("foo.*", 2)
+    index.add("foo.>", 3)
+    index.add("foo.*.baz", 4)
+    index.add(">", 5)
+
+    assert sorted(index.match("foo.bar")) == [1, 2, 3, 5]
+    assert sorted(index.match("foo.qux")) == [2, 3, 5]
+    assert sorted(index.match("foo.bar.baz")) == [3, 4, 5]
+    assert sorted(index.match("foo")) == [5]
+    assert index.match("") == (5,)
+    assert len(index) == 5
+
+
+def test_subject_index_remove():
+    index = SubjectIndex()
+    value = object()
+    index.add("foo.*.baz", value)
+    index.add("foo.*.baz", 2)
+
+    assert index.remove("foo.*.baz", value) == [value]
+    assert index.match("foo.bar.baz") == (2,)
+    assert index.remove("foo.*.baz") == [2]
+    assert index.match("foo.bar.baz") == ()
+    assert index.remove("not.existing") == []
+    assert len(index) == 0
+
+
+def test_pattern_covers():
+    assert pattern_covers("foo.>", "foo.bar") is True
+    assert pattern_covers("foo.>", "foo.*.baz") is True
+    assert pattern_covers("foo.>", "foo.>") is True
+    assert pattern_covers("foo.>", "foo") is False
+    assert pattern_covers("foo.*", "foo.bar") is True
+    assert pattern_covers("foo.*", "foo.>") is False
+    assert pattern_covers("foo.*", "foo.bar.baz") is False
+    assert pattern_covers("foo.bar", "foo.*") is False
+
+
+def test_subject_index_cache_invalidation():
+    index = SubjectIndex(cache_size=2)
+    index.add("foo.*", 1)
+    assert index.match("foo.bar") == (1,)
+    index.add("foo.bar", 2)
+    assert sorted(index.match("foo.bar")) == [1, 2]
+    index.remove("foo.*")
+    assert index.match("foo.bar") == (2,)
+    for subject in ("a", "b", "c"):
+        index.match(subject)
+    assert len(index._cache) == 2
+
+
+def test_subject_matches():
+    assert subject_matches("foo.*.baz", "foo.bar.baz") is True
+    assert subject_matches("foo.>", "foo.bar.baz") is True
+    assert subject_matches("foo.*", "foo.bar.baz") is False
+    assert subject_matches("foo.bar", "foo.bar") is True
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+from panini.middleware import Middleware
+
+
+class FailingSendMiddleware(Middleware):
+    calls = []
+
+    async def send_publish(self, subject: str, message, publish_func, *args, **kwargs):
+        self.calls.append((subject, type(message).__name__))
+        if subject == "test_sync_bridge.fail":
+            raise ValueError("publish failed")
+        return await publish_func(subject, message, *args, **kwargs)
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_sync_bridge",
+        host="127.0.0.1",
+        port=4222,
+        logger_in_separate_process=False,
+    )
+    app.add_middleware(FailingSendMiddleware)
+    bridge = app.sync_client()
+    received = []
+
+    @app.listen("test_sync_bridge.add")
+    async def add(msg):
+        return {"data": msg.data["data"] + 1}
+
+    @app.listen("test_sync_bridge.collect")
+    async def collect(msg):
+        received.append(msg.data["data"])
+
+    @app.listen("test_sync_bridge.request_from_thread", executor="thread")
+    def request_from_thread(msg):
+        futures = [bridge.request_future("test_sync_bridge.add", {"data": i}) for i in range(3)]
+        return {
+            "data": bridge.request("test_sync_bridge.add", {"data": msg.data["data"]})["data"],
+            "futures": [future.result()["data"] for future in futures],
+        }
+
+    @app.listen("test_sync_bridge.publish_from_threads", executor="thread")
+    def publish_from_threads(msg):
+        received.clear()
+
+        def produce(thread_index):
+            for i in range(250):
+                bridge.publish("test_sync_bridge.collect", {"data": thread_index * 1000 + i})
+
+        threads = [threading.Thread(target=produce, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        bridge.flush()
+        return {"pending": bridge.pending}
+
+    @app.listen("test_sync_bridge.publish_single", executor="thread")
+    def publish_single(msg):
+        FailingSendMiddleware.calls.clear()
+        app.nats.publish_from_another_thread("test_sync_bridge.collect", {"data": 1})
+        bridge.flush()
+        calls = list(FailingSendMiddleware.calls)
+        bridge.publish("test_sync_bridge.fail", {"data": 2})
+        try:
+            bridge.flush()
+            error = None
+        except ValueError as e:
+            error = str(e)
+        # the error is raised once
+        bridge.flush()
+        return {"calls": calls, "error": error}
+
+    @app.listen("test_sync_bridge.received")
+    async def get_received(msg):
+        return {"data": received}
+
+    @app.listen("test_sync_bridge.request_in_loop")
+    async def request_in_loop(msg):
+        try:
+            bridge.request("test_sync_bridge.add", {"data": 1})
+        except RuntimeError:
+            return {"error": True}
+        return {"error": False}
+
+    app.start()
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_request_from_thread(client):
+    response = client.request("test_sync_bridge.request_from_thread", {"data": 10})
+    assert response["data"] == 11
+    assert response["futures"] == [1, 2, 3]
+
+
+def test_publish_from_threads(client):
+    response = client.request("test_sync_bridge.publish_from_threads", {})
+    assert response["pending"] == 0
+
+    received = client.request("test_sync_bridge.received", {})["data"]
+    assert len(received) == 1000
+    # messages of each thread keep their order
+    for thread_index in range(4):
+        values = [value for value in received if value // 1000 == thread_index]
+        assert values == [thread_index * 1000 + i for i in range(250)]
+
+
+def test_publish_single_and_flush_error(client):
+    response = client.request("test_sync_bridge.publish_single", {})
+    # publish_from_another_thread keeps the per-message middlewares call
+    assert response["calls"] == [["test_sync_bridge.collect", "dict"]]
+    assert response["error"] == "publish failed"
+
+
+def test_request_in_loop_raises(client):
+    assert client.request("test_sync_bridge.request_in_loop", {})["error"] is True
@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+from panini.test_client import TestClient
+from panini import app as panini_app
+
+
+def run_panini():
+    app = panini_app.App(
+        service_name="test_workers",
+        host="127.0.0.1",
+        port=4222,
+    )
+
+    @app.listen("test_workers.pid")
+    async def pid(msg):
+        return {"pid": os.getpid(), "supervisor_pid": os.getppid()}
+
+    @app.listen("test_workers.crash")
+    async def crash(msg):
+        os._exit(1)
+
+    app.start(workers=2)
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(run_panini)
+    client.start(is_daemon=False)
+    yield client
+    client.stop()
+
+
+def get_worker_pids(client, requests: int = 40) -> set:
+    pids = set()
+    for _ in range(requests):
+        response = client.request("test_workers.pid", {})
+        assert response["supervisor_pid"] == client.panini_process.pid
+        pids.add(response["pid"])
+    return pids
+
+
+def test_workers(client):
+    time.sleep(0.5)  # the second worker may subscribe a bit later than the first one
+    pids = get_worker_pids(client)
+    assert len(pids) == 2
+    assert client.panini_process.pid not in pids
+
+
+def test_crashed_worker_restart(client):
+    pids = get_worker_pids(client)
+    client.publish("test_workers.crash", {})
+    time.sleep(2)
+
+    new_pids = get_worker_pids(client)
+    assert len(new_pids) == 2
+    assert len(pids & new_pids) == 1